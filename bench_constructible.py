@@ -0,0 +1,267 @@
+# coding:utf-8
+#
+#    Copyright 2016 Leonhard Vogt
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+from __future__ import division, print_function
+
+'''
+Benchmarks for constructible
+
+Run all benchmarks and store the results:
+
+    python bench_constructible.py run -o before.json
+
+Compare two runs, exiting with status 1 if something got slower:
+
+    python bench_constructible.py compare before.json after.json
+'''
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+from fractions import Fraction
+
+import constructible
+from constructible import Constructible, sqrt
+
+_primes = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29)
+_depths = (0, 1, 2, 3, 4)
+
+
+def element(depth, offset=0):
+    ''' an element with all coefficients non-zero in the tower of depth
+    `depth` built from the square roots of the first primes '''
+    x = Constructible(1 + offset)
+    for k, p in enumerate(_primes[:depth]):
+        x = x * (k + offset + 1 + sqrt(p))
+    return x
+
+
+def fresh(x):
+    ''' a copy of x without any cached data '''
+    if not x.field:
+        return Constructible(x.a)
+    return Constructible(fresh(x.a), fresh(x.b), x.field)
+
+
+# Each benchmark takes a parameter and returns the function to be timed.
+# Setup work done before returning is not measured.
+
+def bench_isqrt(digits):
+    n = (10 ** (digits // 2) + 3) ** 2 * (10 ** (digits // 2) + 7)
+    return lambda: constructible.isqrt(n)
+
+
+def bench_fsqrt(digits):
+    q = Fraction(3 ** digits * 2, 7 ** (digits // 2) * 5)
+    return lambda: constructible.fsqrt(q)
+
+
+def bench_sqrt_denest(depth):
+    x = element(depth)
+    square = x * x
+    return lambda: sqrt(fresh(square))
+
+
+def bench_join_fields(depth):
+    a = element(depth).field
+    b = sqrt(31).field
+
+    def run():
+        constructible.join_cache.clear()
+        Constructible.join_fields(a, b)
+    return run
+
+
+def bench_join_fields_cached(depth):
+    a = element(depth).field
+    b = sqrt(31).field
+    return lambda: Constructible.join_fields(a, b)
+
+
+def bench_sign(depth):
+    x = element(depth) - element(depth, 1) / 2
+    return lambda: fresh(x)._sign()  # pylint: disable=protected-access
+
+
+def bench_compare(depth):
+    x, y = element(depth), element(depth, 1)
+    return lambda: fresh(x) < fresh(y)
+
+
+def bench_sort(depth):
+    values = [element(depth) / (k + 1) - k for k in range(20)]
+    return lambda: sorted(fresh(x) for x in values)
+
+
+def bench_sorted_exact(depth):
+    values = [element(depth) / (k + 1) - k for k in range(20)]
+    return lambda: constructible.sorted_exact(fresh(x) for x in values)
+
+
+def bench_mul(depth):
+    x, y = element(depth), element(depth, 1)
+    return lambda: fresh(x) * fresh(y)
+
+
+def bench_inverse(depth):
+    x = element(depth)
+    return lambda: fresh(x).inverse()
+
+
+def bench_minpoly(depth):
+    x = element(depth)
+    return lambda: fresh(x).minpoly()
+
+
+def bench_hash(depth):
+    x = element(depth)
+    return lambda: hash(fresh(x))
+
+
+def bench_heptadecagon(turns):
+    r = sqrt(17)
+    u = sqrt(2 * (17 - r))
+    v = sqrt(2 * (17 + r))
+    cos = (-1 + r + u + 2 * sqrt(17 + 3 * r - u - 2 * v)) / 16
+    sin = sqrt(1 - cos * cos)
+
+    def run():
+        s_i, c_i = 0, 1
+        for _ in range(17 * turns):
+            s_i, c_i = sin * c_i + cos * s_i, cos * c_i - sin * s_i
+        assert s_i == 0 and c_i == 1
+    return run
+
+
+def bench_solve(size):
+    rows = [[element(2, (i * size + j) % 5) - i + (j == i) * 100 for j in range(size)]
+            for i in range(size)]
+    matrix = constructible.Matrix(rows)
+    return lambda: matrix.solve(list(range(size)))
+
+
+BENCHMARKS = [
+    (bench_isqrt, (6, 12, 18, 24)),
+    (bench_fsqrt, (10, 40, 160)),
+    (bench_sqrt_denest, _depths),
+    (bench_join_fields, _depths),
+    (bench_join_fields_cached, _depths),
+    (bench_sign, _depths),
+    (bench_compare, _depths),
+    (bench_sort, _depths),
+    (bench_sorted_exact, _depths),
+    (bench_mul, _depths),
+    (bench_inverse, _depths),
+    (bench_minpoly, _depths),
+    (bench_hash, _depths),
+    (bench_heptadecagon, (1, 2)),
+    (bench_solve, (5, 10, 20)),
+]
+
+
+def measure(func, min_time=0.05, repeat=3):
+    ''' return the best time per call in seconds '''
+    number = 1
+    while True:
+        elapsed = timeit.timeit(func, number=number)
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed * 10 > min_time else 10
+    times = [elapsed] + timeit.repeat(func, number=number, repeat=repeat - 1)
+    return min(times) / number, number
+
+
+def run(pattern='', min_time=0.05, repeat=3, out=sys.stdout):
+    ''' run the benchmarks whose name contains pattern, return the results '''
+    results = {}
+    for bench, params in BENCHMARKS:
+        name = bench.__name__[len('bench_'):]
+        if pattern not in name:
+            continue
+        for param in params:
+            key = '%s[%s]' % (name, param)
+            seconds, number = measure(bench(param), min_time, repeat)
+            results[key] = {'seconds': seconds, 'number': number}
+            print('%-28s %12.3f us' % (key, seconds * 1e6), file=out)
+    return {
+        'python': platform.python_implementation(),
+        'version': platform.python_version(),
+        'results': results,
+    }
+
+
+def compare(before, after, threshold=1.25):
+    ''' compare two benchmark runs
+
+    returns a list of tuples (key, seconds before, seconds after, ratio)
+    and the list of keys which got slower by more than the threshold.
+    '''
+    rows = []
+    slower = []
+    for key in sorted(set(before['results']) & set(after['results'])):
+        old = before['results'][key]['seconds']
+        new = after['results'][key]['seconds']
+        ratio = new / old if old else float('inf')
+        rows.append((key, old, new, ratio))
+        if ratio > threshold:
+            slower.append(key)
+    return rows, slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='benchmarks for constructible')
+    commands = parser.add_subparsers(dest='command')
+
+    run_parser = commands.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('-o', '--output', help='write the results as JSON to this file')
+    run_parser.add_argument('-k', '--filter', default='', help='only run benchmarks containing this')
+    run_parser.add_argument('--min-time', type=float, default=0.05,
+                            help='minimal duration of one measurement in seconds')
+    run_parser.add_argument('--repeat', type=int, default=3, help='number of measurements')
+
+    compare_parser = commands.add_parser('compare', help='compare two runs')
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    compare_parser.add_argument('--threshold', type=float, default=1.25,
+                                help='flag benchmarks slower by more than this factor')
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        results = run(args.filter, args.min_time, args.repeat)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+        return 0
+
+    if args.command == 'compare':
+        with open(args.before) as f:
+            before = json.load(f)
+        with open(args.after) as f:
+            after = json.load(f)
+        rows, slower = compare(before, after, args.threshold)
+        for key, old, new, ratio in rows:
+            flag = '  SLOWER' if key in slower else ''
+            print('%-28s %12.3f us %12.3f us %7.2fx%s' % (key, old * 1e6, new * 1e6, ratio, flag))
+        return 1 if slower else 0
+
+    parser.print_help()
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -24,23 +24,166 @@ Representing constructible numbers
 Author: Leonhard Vogt
 '''
 
+from collections import namedtuple, OrderedDict
 from fractions import Fraction
+from functools import cmp_to_key
+import mmap
 from numbers import Rational
+import time
+import weakref
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from math import gcd
+except ImportError:  # Python 2
+    from fractions import gcd
+
+try:
+    _int_sqrt = math.isqrt
+except AttributeError:  # Python < 3.8
+    def _int_sqrt(n):
+        """the integer square root floor(sqrt(n)) of a non-negative integer n"""
+        if n < 2:
+            return n
+        x = 1 << ((n.bit_length() + 1) // 2)
+        while True:
+            y = (x + n // x) // 2
+            if y >= x:
+                return x
+            x = y
 
-# increments of prime divisor candidates after 7, giving 73% skip
-_divisor_incs = (4,  2,  4,  2,  4,  6,  2,  6)
-#               11, 13, 17, 19, 23, 29, 31, 37 (mod 30)
-# here to avoid reevaluation each time `isqrt` is called
 
-def _divisors():
-    yield 2
-    yield 3
-    yield 5
-    k = 7
+def _integer_root(n, k):
+    """the integer k-th root floor(n ** (1/k)) of a non-negative integer n"""
+    if n < 2:
+        return n
+    x = 1 << (n.bit_length() // k + 1)
     while True:
-        for k_inc in _divisor_incs:
-            yield k
-            k += k_inc
+        y = ((k - 1) * x + n // x ** (k - 1)) // k
+        if y >= x:
+            return x
+        x = y
+
+
+def _prime_sieve(limit):
+    """all primes below limit"""
+    sieve = bytearray([1]) * limit
+    sieve[:2] = b'\x00\x00'
+    for k in range(2, _int_sqrt(limit - 1) + 1):
+        if sieve[k]:
+            sieve[k * k::k] = bytearray(len(range(k * k, limit, k)))
+    return [k for k in range(limit) if sieve[k]]
+
+_small_primes = _prime_sieve(1000)
+_small_primes_limit = 1000 * 1000
+_miller_rabin_bases = _small_primes[:13]
+
+
+def _is_prime(n):
+    """Miller-Rabin primality test.
+
+    Deterministic for n < 3.3 * 10**24, for larger n a composite is
+    mistaken for a prime with a probability below 4**-13.
+    """
+    if n < _small_primes_limit:
+        if n < 2:
+            return False
+        for p in _small_primes:
+            if p * p > n:
+                return True
+            if n % p == 0:
+                return n == p
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for a in _miller_rabin_bases:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _perfect_power(n):
+    """return (root, k) with n == root ** k and k maximal"""
+    for k in _small_primes:
+        if 1 << k > n:
+            break
+        root = _integer_root(n, k)
+        if root ** k == n:
+            root, j = _perfect_power(root)
+            return root, k * j
+    return n, 1
+
+
+def _pollard_brent(n):
+    """return a non-trivial divisor of the composite odd number n"""
+    for c in range(1, n):
+        y, m, g, r, q = 2, 128, 1, 1, 1
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                for _ in range(min(m, r - k)):
+                    y = (y * y + c) % n
+                    q = q * abs(x - y) % n
+                g = gcd(q, n)
+                k += m
+            r *= 2
+        if g == n:
+            # backtrack the last batch one step at a time
+            g = 1
+            while g == 1:
+                ys = (ys * ys + c) % n
+                g = gcd(abs(x - ys), n)
+        if g != n:
+            return g
+    raise ValueError('no divisor found for %d' % n)
+
+
+def _factorize(n):
+    """return the prime factorization of a positive integer n as a dict"""
+    factors = {}
+    for p in _small_primes:
+        if p * p > n:
+            break
+        if n % p == 0:
+            k = 0
+            while n % p == 0:
+                n //= p
+                k += 1
+            factors[p] = k
+
+    stack = [(n, 1)]
+    while stack:
+        m, k = stack.pop()
+        if m == 1:
+            continue
+        if _is_prime(m):
+            factors[m] = factors.get(m, 0) + k
+            continue
+        root, j = _perfect_power(m)
+        if j > 1:
+            stack.append((root, k * j))
+            continue
+        d = _pollard_brent(m)
+        stack.append((d, k))
+        stack.append((m // d, k))
+    return factors
+
 
 def isqrt(n):
     ''' given a non-negative integer n, return a pair (a,b) such that n = a * a * b
@@ -48,8 +191,6 @@ def isqrt(n):
 
         If n is a perfect square, then a is its square root and b is one.
     '''
-    # TODO: replace with a more efficient implementation
-
     if n == 0:
         return n, 1
     if n < 0:
@@ -59,31 +200,16 @@ def isqrt(n):
     if precomp:
         return precomp
 
-    a, b, c = 1, n, 1
-
-    for k in _divisors():
-        k_sqr = k * k
-        if k_sqr > b:
-            break
-
-        while True:
-            d, m = divmod(b, k_sqr)
-            if m != 0:
-                break
-            a *= k
-            b = d
-
-        d, m = divmod(b, k)
-        if m == 0:
-            b = d
-            c *= k
-
-        precomp = _isqrt_precomputed.get(b)
-        if precomp:
-            a_, b_ = precomp
-            return a * a_, c * b_
+    root = _int_sqrt(n)
+    if root * root == n:
+        return root, 1
 
-    return a, b * c
+    a, b = 1, 1
+    for p, k in _factorize(n).items():
+        a *= p ** (k // 2)
+        if k % 2:
+            b *= p
+    return a, b
 
 _isqrt_precomputed = dict() # should be defined before calling `isqrt`
 _isqrt_precomputed = {n: isqrt(n) for n in range(1, 1 + 100)}
@@ -107,6 +233,273 @@ def fsqrt(q):
     return Fraction(a, c * d), b * d
 
 
+class Field(object):
+    """A field in the tower of quadratic extensions of the rationals.
+
+    Field() is the field of rational numbers, Field(r, K) is the extension
+    K[sqrt(r)] of the field K, where r is a Constructible in K.
+
+    Fields are interned: equal towers are represented by the same instance,
+    so fields can (and should) be compared by identity. For compatibility
+    a Field behaves like the tuple () or (r, K) respectively.
+    """
+    __slots__ = ('r', 'base', 'depth', '_key', '_flat', '__weakref__')
+
+    def __new__(cls, r=None, base=None):
+        if r is None:
+            if base is not None:
+                raise ValueError('can not set base field without radicand')
+            return _Q
+
+        base = Field.of(base)
+        assert isinstance(r, Constructible)
+        assert r.field is base
+        key = (base, _structural_key(r))
+        field = _fields.get(key)
+        if field is None:
+            field = object.__new__(cls)
+            field.r = r
+            field.base = base
+            field.depth = base.depth + 1
+            field._key = key
+            field._flat = None
+            _fields[key] = field
+        return field
+
+    @staticmethod
+    def of(field):
+        """return the interned Field for field given as a Field or a tuple"""
+        if isinstance(field, Field):
+            return field
+        if not field:
+            return _Q
+        r, base = field
+        return Field(r, base)
+
+    def __reduce__(self):
+        if self:
+            return (Field, (self.r, self.base))
+        return (Field, ())
+
+    def __len__(self):
+        return 2 if self.depth else 0
+
+    def __bool__(self):
+        return self.depth != 0
+
+    __nonzero__ = __bool__
+
+    def __getitem__(self, index):
+        return (self.r, self.base)[index] if self else ()[index]
+
+    def __iter__(self):
+        return iter((self.r, self.base) if self else ())
+
+    def __eq__(self, other):
+        if isinstance(other, Field):
+            return self is other
+        if isinstance(other, tuple):
+            return self is Field.of(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = object.__hash__
+
+    def __repr__(self):
+        if self:
+            return '(%r, %r)' % (self.r, self.base)
+        return '()'
+
+
+def _structural_key(x):
+    """a hashable key for the representation of x in its field.
+
+    The representation in a given field is unique, so together with the field
+    this key identifies the value of x.
+    """
+    if not x.field:
+        return x.a
+    return (_structural_key(x.a), _structural_key(x.b))
+
+
+_fields = weakref.WeakValueDictionary()
+_Q = object.__new__(Field)
+_Q.r = None
+_Q.base = None
+_Q.depth = 0
+_Q._key = None
+_Q._flat = (None, 1, 1)
+
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+
+class LRUCache(object):
+    """A bounded mapping evicting the least recently used entries.
+
+    maxsize=None means unbounded, maxsize=0 disables the cache.
+    """
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        """return the value cached for key and mark it as recently used"""
+        try:
+            value = self._data.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """store value for key, evicting old entries if necessary"""
+        if self.maxsize == 0:
+            return
+        self._data.pop(key, None)
+        self._data[key] = value
+        if self.maxsize is not None:
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def resize(self, maxsize):
+        """change the maximum size, evicting entries if necessary"""
+        self.maxsize = maxsize
+        if maxsize is not None:
+            while len(self._data) > maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """remove all entries and reset the statistics"""
+        self._data.clear()
+        self.hits = self.misses = 0
+
+    def info(self):
+        """return the cache statistics as a CacheInfo tuple"""
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def __len__(self):
+        return len(self._data)
+
+
+def _preserving_fields(func):
+    """decorator for functions relying on arithmetic results staying in the
+    field of the operands: no automatic simplification while func runs"""
+    def wrapper(*args, **kwargs):
+        global _simplify_suspended
+        _simplify_suspended += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _simplify_suspended -= 1
+    wrapper.__name__ = func.__name__
+    wrapper.__doc__ = func.__doc__
+    return wrapper
+
+
+def _negate_poly(poly):
+    """given the monic minimal polynomial of x return the one of -x"""
+    deg = len(poly) - 1
+    return tuple(c if (deg - i) % 2 == 0 else -c for i, c in enumerate(poly))
+
+
+def _scale_poly(poly, q):
+    """given the monic minimal polynomial of x return the one of q * x, q != 0"""
+    deg = len(poly) - 1
+    return tuple(c * q ** (deg - i) for i, c in enumerate(poly))
+
+
+_karatsuba_cutoff = 8
+
+
+def _poly_add(p, q):
+    """sum of the polynomials p and q given as lists of coefficients"""
+    if len(p) < len(q):
+        p, q = q, p
+    return [c + q[i] for i, c in enumerate(p[:len(q)])] + p[len(q):]
+
+
+def _poly_mul(p, q, zero):
+    """product of the polynomials p and q given as lists of coefficients
+
+    The coefficients can be of any ring type, zero is its zero element.
+    Long polynomials are multiplied with the Karatsuba algorithm.
+    """
+    if not p or not q:
+        return []
+    if len(p) < len(q):
+        p, q = q, p
+    if len(q) < _karatsuba_cutoff:
+        result = [zero] * (len(p) + len(q) - 1)
+        for i, a in enumerate(p):
+            for j, b in enumerate(q):
+                result[i + j] = result[i + j] + a * b
+        return result
+
+    half = len(p) // 2
+    p0, p1 = p[:half], p[half:]
+    if len(q) <= half:
+        z0, z2 = _poly_mul(p0, q, zero), _poly_mul(p1, q, zero)
+        result = z0 + [zero] * (len(p) + len(q) - 1 - len(z0))
+        for i, c in enumerate(z2):
+            result[half + i] = result[half + i] + c
+        return result
+
+    q0, q1 = q[:half], q[half:]
+    z0 = _poly_mul(p0, q0, zero)
+    z2 = _poly_mul(p1, q1, zero)
+    z1 = _poly_mul(_poly_add(p0, p1), _poly_add(q0, q1), zero)
+    result = [zero] * (len(p) + len(q) - 1)
+    for i, c in enumerate(z0):
+        result[i] = result[i] + c
+        z1[i] = z1[i] - c
+    for i, c in enumerate(z2):
+        result[2 * half + i] = result[2 * half + i] + c
+        z1[i] = z1[i] - c
+    for i, c in enumerate(z1):
+        result[half + i] = result[half + i] + c
+    return result
+
+
+def _int_poly_mul(p, q):
+    """product of polynomials with integer coefficients by Kronecker substitution
+
+    The polynomials are evaluated at a large power of two, the product of the
+    two big integers is then split again into the coefficients.
+    """
+    if not p or not q:
+        return []
+    bound = max(abs(c) for c in p) * max(abs(c) for c in q) * min(len(p), len(q))
+    bits = bound.bit_length() + 1
+    mask = (1 << bits) - 1
+    half = 1 << (bits - 1)
+
+    def pack(poly):
+        result = 0
+        for c in reversed(poly):
+            result = (result << bits) + c
+        return result
+
+    n = pack(p) * pack(q)
+    result = []
+    for _ in range(len(p) + len(q) - 1):
+        c = n & mask
+        if c >= half:
+            c -= mask + 1
+        result.append(c)
+        n = (n - c) >> bits
+    return result
+
+
 class Constructible(object):
     """This class implements constructible numbers.
     
@@ -115,6 +508,8 @@ class Constructible(object):
     use constructible.sqrt .
     """
     # pylint: disable=protected-access
+    __slots__ = ('_a', '_b', 'field', 'is_zero', '_approx', '_minpoly', '_hash', '_ints')
+
     def __init__(self, a, b=None, field=()):
         """constructs a Constructible instance.
         
@@ -124,42 +519,63 @@ class Constructible(object):
         The default arguments are for internal use:
         
         If a and b are given they must be Constructible instances in the
-        same rational extension K. field must be a tuple (r, K) with 
+        same rational extension K. field must be a Field or a tuple (r, K) with 
         r in K. The resulting Constructible represents a + b * sqrt(r) in K[sqrt(r)]
         """
-        assert isinstance(field, tuple)
-        if field:
-            assert len(field) == 2
-            assert isinstance(field[0], Constructible)
-            assert isinstance(field[1], tuple)
+        if field.__class__ is not Field:
+            field = Field.of(field)
+        self._approx = None
+        self._minpoly = None
+        self._hash = None
+        self._ints = None
         if b is None:
             if field:
                 raise ValueError('can not set field if b is not given')
 
             if isinstance(a, Constructible):
                 # used as a copy constructior
-                self.a = a.a
-                self.b = a.b
+                self._a = a._a
+                self._b = a._b
                 self.field = a.field
                 self.is_zero = a.is_zero
+                self._approx = a._approx
+                self._minpoly = a._minpoly
+                self._hash = a._hash
+                self._ints = a._ints
 
             else:
                 # used as a conversion from Fraction, int or float
-                self.a = Fraction(a)
-                self.b = 0
-                self.field = ()
+                self._a = Fraction(a)
+                self._b = 0
+                self.field = _Q
                 self.is_zero = (a == 0)
 
         else:
             # 'private' constructor
-            self.a = a
-            self.b = b
+            self._a = a
+            self._b = b
             self.field = field
             if field:
                 self.is_zero = a.is_zero and b.is_zero
             else:
                 self.is_zero = (a == b == 0)
-            assert not field or a.field == b.field == self.base_field, '%r, %r, %r, %r' % (field, a.field, b.field, self.base_field)
+            assert not field or a.field is b.field is self.base_field, '%r, %r, %r, %r' % (field, a.field, b.field, self.base_field)
+
+
+    @property
+    def a(self):
+        """The rational value, or the part in the base field"""
+        if self._a is None:
+            self._expand()
+        return self._a
+
+
+    @property
+    def b(self):
+        """zero, or the coefficient in the base field of sqrt(r)"""
+        if self._a is None:
+            self._expand()
+        return self._b
 
 
     @property
@@ -169,7 +585,7 @@ class Constructible(object):
         The instance ist contained in the quardratic extension field
         base_field[sqrt(r)]
         """
-        return self.field[0]
+        return self.field.r
 
 
     @property
@@ -179,7 +595,7 @@ class Constructible(object):
         The instance ist contained in the quadratic extension field
         base_field[sqrt(r)]
         """
-        return self.field[1]
+        return self.field.base
 
 
     def __repr__(self):
@@ -215,7 +631,14 @@ class Constructible(object):
         return self
 
     def __neg__(self):
-        return Constructible(-self.a, -self.b, self.field)
+        if self._a is None:
+            result = Constructible._from_ints(
+                self.field, [-n for n in self._ints[0]], self._ints[1])
+        else:
+            result = Constructible(-self.a, -self.b, self.field)
+        if self._minpoly is not None:
+            result._minpoly = _negate_poly(self._minpoly)
+        return result
 
     def __add__(self, other):
         if not isinstance(other, Constructible):
@@ -229,7 +652,13 @@ class Constructible(object):
         if other.is_zero:
             return self
 
-        if self.field == other.field:
+        if self.field is other.field:
+            if self._ints is not None and other._ints is not None:
+                (x, dx), (y, dy) = self._ints, other._ints
+                den = dx // gcd(dx, dy) * dy
+                fx, fy = den // dx, den // dy
+                return Constructible._from_ints(
+                    self.field, [u * fx + v * fy for u, v in zip(x, y)], den)
             return Constructible(self.a + other.a, self.b + other.b, self.field)
 
         a, b = self.join(other)
@@ -245,7 +674,19 @@ class Constructible(object):
 
     # Multiplicative Group Operations * /
     def inverse(self):
-        """the multiplicative inverse of the instance"""
+        """the multiplicative inverse of the instance
+
+        The result is simplified if auto_simplify is set.
+        """
+        if not auto_simplify or _simplify_suspended:
+            return self._inverse()
+        return _preserving_fields(Constructible._inverse)(self).simplify()
+
+    def _inverse(self):
+        """the multiplicative inverse in the field of the instance"""
+        if fraction_free_depth is not None and self.field.depth >= fraction_free_depth:
+            x, den = self._integer_coefficients()
+            return Constructible._from_ints(self.field, *_flat_inverse(self.field, x, den))
         if self.field:
             # 1/(a+b√r) = (a-b√r)/((a+b√r)*(a-b√r)) = (a-b√r) / (a*a-b*b*r)
             d = self.a * self.a - self.b * self.b * self.r
@@ -255,9 +696,25 @@ class Constructible(object):
             return Constructible(1 / self.a)
 
     def __mul__(self, other):
+        if not auto_simplify or _simplify_suspended or other.__class__ is not Constructible:
+            return self._mul(other)
+        return _preserving_fields(Constructible._mul)(self, other).simplify()
+
+    def _mul(self, other):
+        """the product in the common field of the operands"""
         if not isinstance(other, Constructible):
             if isinstance(other, Rational):
-                return Constructible(self.a * other, self.b * other, self.field)
+                if self._a is None:
+                    nums, den = self._ints
+                    other = Fraction(other)
+                    result = Constructible._from_ints(
+                        self.field, [n * other.numerator for n in nums],
+                        den * other.denominator)
+                else:
+                    result = Constructible(self.a * other, self.b * other, self.field)
+                if self._minpoly is not None and other != 0:
+                    result._minpoly = _scale_poly(self._minpoly, other)
+                return result
             else:
                 return NotImplemented
 
@@ -266,9 +723,15 @@ class Constructible(object):
         if other.is_zero:
             return other
 
-        if self.field == other.field:
+        if self.field is other.field:
             if not self.field:
                 return Constructible(self.a * other.a)
+            if fraction_free_depth is not None and self.field.depth >= fraction_free_depth:
+                x, dx = self._integer_coefficients()
+                y, dy = other._integer_coefficients()
+                return Constructible._from_ints(
+                    self.field, _flat_mul(self.field, x, y),
+                    dx * dy * _flat_constants(self.field)[2])
             # (a+b√r)(c+d√r) = (ac+bdr) + (ad+bc)√r
             return Constructible(self.a * other.a + self.b * other.b * self.r,
                                  self.a * other.b + self.b * other.a,
@@ -280,7 +743,10 @@ class Constructible(object):
     def __truediv__(self, other):
         if not isinstance(other, Constructible):
             if isinstance(other, Rational):
-                return Constructible(self.a / other, self.b / other, self.field)
+                result = Constructible(self.a / other, self.b / other, self.field)
+                if self._minpoly is not None:
+                    result._minpoly = _scale_poly(self._minpoly, 1 / Fraction(other))
+                return result
             else:
                 return NotImplemented
 
@@ -291,6 +757,75 @@ class Constructible(object):
     def __rtruediv__(self, other):
         return self.inverse() * other
 
+    # fraction free arithmetic
+    def _integer_coefficients(self):
+        """the flat representation (nums, den) of the instance, see _to_flat
+
+        The representation is cached and not necessarily reduced.
+        """
+        if self._ints is None:
+            self._ints = _to_flat(self)
+        return self._ints
+
+    @staticmethod
+    def _from_ints(field, nums, den):
+        """construct the element nums / den of field from its flat representation
+
+        The parts a and b of the result are only computed when needed.
+        """
+        if den.bit_length() > _fraction_free_max_bits:
+            g = den
+            for n in nums:
+                g = gcd(g, n)
+            nums = [n // g for n in nums]
+            den //= g
+        if not field:
+            return Constructible(Fraction(nums[0], den))
+        result = object.__new__(Constructible)
+        result._a = result._b = None
+        result.field = field
+        result.is_zero = not any(nums)
+        result._approx = result._minpoly = result._hash = None
+        result._ints = (nums, den)
+        return result
+
+    def _expand(self):
+        """compute a and b from the flat representation"""
+        nums, den = self._ints
+        half = len(nums) // 2
+        self._a = Constructible._from_ints(self.field.base, nums[:half], den)
+        self._b = Constructible._from_ints(self.field.base, nums[half:], den)
+
+    def simplify(self):
+        """return self represented in the smallest subtower of its field
+
+        Levels of the tower whose square root does not occur in the
+        representation of self (all their b parts vanish) are removed,
+        unless the radicand of a remaining level depends on them.
+        """
+        if not self.field:
+            return self
+        nums, den = self._integer_coefficients()
+        full = (1 << self.field.depth) - 1
+        if _used_levels(nums) == full:
+            return self
+        field, needed = _subtower(self.field, _used_levels(nums))
+        if needed == full:
+            return self
+        result = Constructible._from_ints(field, _compress(nums, needed), den)
+        result._approx = self._approx
+        result._minpoly = self._minpoly
+        result._hash = self._hash
+        return result
+
+    def __reduce__(self):
+        # pickle the flat integer representation instead of the tree of parts,
+        # the pickle memo makes sure each field is written only once.
+        if not self.field:
+            return (Constructible, (self.a,))
+        nums, den = self._integer_coefficients()
+        return (Constructible._from_ints, (self.field, [int(n) for n in nums], int(den)))
+
     # equality and ordering
     def _sign(self):
         """The sign of the instance
@@ -316,6 +851,12 @@ class Constructible(object):
                 return self.b._sign()
             if self.b.is_zero:
                 return self.a._sign()
+            for prec in _interval_precisions:
+                lo, hi = self._interval(prec)
+                if lo > 0:
+                    return 1
+                if hi < 0:
+                    return -1
             sa = self.a._sign()
             sb = self.b._sign()
             if sa == sb:
@@ -323,6 +864,60 @@ class Constructible(object):
             else:
                 return sa * (self.a * self.a - self.r * self.b * self.b)._sign()
 
+    def _interval(self, prec):
+        """an enclosure of the value of the instance with prec fractional bits
+
+        returns integers (lo, hi) such that lo <= self * 2**prec <= hi.
+        The enclosure of the highest precision requested so far is cached.
+        """
+        if self._approx is not None and self._approx[0] >= prec:
+            cached, lo, hi = self._approx
+            shift = cached - prec
+            return lo >> shift, -(-hi >> shift)
+
+        if not self.field:
+            num, den = self.a.numerator << prec, self.a.denominator
+            lo = num // den
+            hi = -(-num // den)
+        elif self._a is None:
+            # from the flat representation, without expanding it
+            nums, den = self._ints
+            lo = hi = 0
+            for n, (blo, bhi) in zip(nums, _basis_intervals(self.field, prec)):
+                if n > 0:
+                    lo += n * blo
+                    hi += n * bhi
+                elif n < 0:
+                    lo += n * bhi
+                    hi += n * blo
+            lo = int(lo // den)
+            hi = int(-(-hi // den))
+        else:
+            alo, ahi = self.a._interval(prec)
+            blo, bhi = self.b._interval(prec)
+            rlo, rhi = self.r._interval(prec)
+            # sqrt(r) * 2**prec == sqrt(r * 2**prec * 2**prec)
+            slo = _int_sqrt(max(rlo, 0) << prec)
+            shi = _int_sqrt(max(rhi, 0) << prec) + 1
+            products = (blo * slo, blo * shi, bhi * slo, bhi * shi)
+            lo = alo + (min(products) >> prec)
+            hi = ahi - (-max(products) >> prec)
+
+        self._approx = (prec, lo, hi)
+        return lo, hi
+
+    def _compare(self, other):
+        """The sign of self - other, avoiding the subtraction if possible"""
+        if self.field or other.field:
+            for prec in _interval_precisions:
+                slo, shi = self._interval(prec)
+                olo, ohi = other._interval(prec)
+                if shi < olo:
+                    return -1
+                if slo > ohi:
+                    return 1
+        return (self - other)._sign()
+
     def __bool__(self):
         return self != 0
 
@@ -332,43 +927,55 @@ class Constructible(object):
         if other == 0:
             return self.is_zero
 
-        if isinstance(other, Constructible) or isinstance(other, Rational):
-            return (self -other)._sign() == 0
-
-        return NotImplemented
+        if isinstance(other, Rational):
+            other = Constructible(other)
+        elif not isinstance(other, Constructible):
+            return NotImplemented
+
+        if self.field or other.field:
+            slo, shi = self._interval(_interval_precisions[0])
+            olo, ohi = other._interval(_interval_precisions[0])
+            if shi < olo or ohi < slo:
+                return False
+            if modular_zero_test and self.field is not other.field:
+                # avoid joining the fields if the numbers differ
+                if _modular_differ(self, other):
+                    return False
+        return (self - other).is_zero
 
     def __ne__(self, other):
-        if other == 0:
-            return not self.is_zero
-
-        if isinstance(other, Constructible) or isinstance(other, Rational):
-            return (self -other)._sign() != 0
-
-        return NotImplemented
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
 
     def __lt__(self, other):
-        if isinstance(other, Constructible) or isinstance(other, Rational):
-            return (self -other)._sign() < 0
-
-        return NotImplemented
+        if isinstance(other, Rational):
+            other = Constructible(other)
+        elif not isinstance(other, Constructible):
+            return NotImplemented
+        return self._compare(other) < 0
 
     def __gt__(self, other):
-        if isinstance(other, Constructible) or isinstance(other, Rational):
-            return (self -other)._sign() > 0
-
-        return NotImplemented
+        if isinstance(other, Rational):
+            other = Constructible(other)
+        elif not isinstance(other, Constructible):
+            return NotImplemented
+        return self._compare(other) > 0
 
     def __le__(self, other):
-        if isinstance(other, Constructible) or isinstance(other, Rational):
-            return (self -other)._sign() <= 0
-
-        return NotImplemented
+        if isinstance(other, Rational):
+            other = Constructible(other)
+        elif not isinstance(other, Constructible):
+            return NotImplemented
+        return self._compare(other) <= 0
 
     def __ge__(self, other):
-        if isinstance(other, Constructible) or isinstance(other, Rational):
-            return (self -other)._sign() >= 0
-
-        return NotImplemented
+        if isinstance(other, Rational):
+            other = Constructible(other)
+        elif not isinstance(other, Constructible):
+            return NotImplemented
+        return self._compare(other) >= 0
 
     # conjugation in the `self.field`
     def _conjugate(self):
@@ -384,51 +991,76 @@ class Constructible(object):
             p(x) := a[0] + a[1] * x + a[2] * x**2 + ... + a[n] * x**n
         and satisfies
             p(self) == 0
+
+        The polynomial is computed once and cached on the instance.
         """
+        if self._minpoly is None:
+            self._minpoly = self._compute_minpoly()
+        return self._minpoly
 
+    @_preserving_fields
+    def _compute_minpoly(self):
+        """uncached implementation of minpoly"""
         field = self.field
         one = Constructible.lift_rational_field(1, field)
-        poly = (-self, one)
+        poly = [-self, one]
 
-        while field:
-            field = field[1]
+        while field.base:
+            r, field = field.r, field.base
             if all(c.b == 0 for c in poly):
                 # `poly` is its own conjugate, so just unlift it
-                poly = tuple(c.a for c in poly)
+                poly = [c.a for c in poly]
                 continue
 
-            # calculate unlifted `poly * conj(poly)`
-            conj_poly = tuple(c._conjugate() for c in poly)
-            new_poly = []
-            deg = len(poly) - 1
+            # with poly == A + B * sqrt(r) calculate the unlifted
+            # poly * conj(poly) == A * A - r * B * B
             zero = Constructible.lift_rational_field(0, field)
+            A = [c.a for c in poly]
+            B = [c.b for c in poly]
+            AA = _poly_mul(A, A, zero)
+            BB = _poly_mul(B, B, zero)
+            poly = [a - r * b for a, b in zip(AA, BB)]
 
-            for m in range(deg * 2 + 1):
-                if m % 2 == 0:
-                    x = poly[m // 2] * conj_poly[m // 2]
-                    assert x.b == 0
-                    coef = x.a
-                else:
-                    coef = zero
-
-                # iterating i such that 0 <= i < m - i <= deg:
-                for i in range(max(0, m - deg), (m + 1) // 2):
-                    x = poly[i] * conj_poly[m - i]
-                    coef += x.a * 2
-
-                new_poly.append(coef)
-
-            poly = new_poly
-
-        return tuple(c.a for c in poly) # a tuple of `Rational`s
+        if not field:
+            # self is rational
+            return tuple(c.a for c in poly)
+
+        # the last step with rational coefficients in integer arithmetic
+        r = field.r.a
+        A = [c.a.a for c in poly]
+        B = [c.b.a for c in poly]
+        if all(b == 0 for b in B):
+            return tuple(A)
+        da = db = 1
+        for a in A:
+            da = da * a.denominator // gcd(da, a.denominator)
+        for b in B:
+            db = db * b.denominator // gcd(db, b.denominator)
+        A = [a.numerator * (da // a.denominator) for a in A]
+        B = [b.numerator * (db // b.denominator) for b in B]
+        AA = _int_poly_mul(A, A)
+        BB = _int_poly_mul(B, B)
+        # A*A - r*B*B == (AA * db**2 * dr - BB * da**2 * nr) / (da**2 * db**2 * dr)
+        fa = db * db * r.denominator
+        fb = da * da * r.numerator
+        den = da * da * db * db * r.denominator
+        return tuple(Fraction(a * fa - b * fb, den) for a, b in zip(AA, BB))
 
     def __hash__(self):
-        # rational numbers compare equal to self.a and also need to have the same hash.
-        if not self.field:
-            return hash(self.a)
-        # otherwise we need a hash that is independent of the representation of
-        # the constructible number.
-        return hash(self.minpoly())
+        if self._hash is None:
+            # rational numbers compare equal to self.a and also need to have the same hash.
+            if not self.field:
+                self._hash = hash(self.a)
+            else:
+                # otherwise we need a hash that is independent of the representation of
+                # the constructible number.
+                poly = self.minpoly()
+                if len(poly) == 2:
+                    # a rational number in a larger field
+                    self._hash = hash(-poly[0])
+                else:
+                    self._hash = hash(poly)
+        return self._hash
 
     def __float__(self):
         if self.is_zero:
@@ -444,12 +1076,25 @@ class Constructible(object):
         return a tuple (new_self, new_other) such that
         new_self == self, new_other == other, and new_self.field == new_other.field
         '''
-        if self.field == other.field:
+        if self.field is other.field:
             return self, other
 
-        _, f1, f2 = Constructible.join_fields(self.field, other.field)
+        field, f1, f2 = Constructible.join_fields(self.field, other.field)
+        if fraction_free_depth is not None and field.depth >= fraction_free_depth:
+            return self._embed(field, f1), other._embed(field, f2)
         return f1(self), f2(other)
 
+    def _embed(self, field, embedding):
+        """represent the instance in the extension field, using the flat
+        representation unless the embedding matrix would be too large"""
+        if self.field is field:
+            return self
+        if self.field.depth + field.depth > _max_embedding_depth:
+            return embedding(self)
+        rows, den = _embedding_matrix(self.field, field)
+        nums, xden = self._integer_coefficients()
+        return Constructible._from_ints(field, _embed_flat(nums, rows), xden * den)
+
     @staticmethod
     def join_fields(field1, field2):
         """find an extension field containing both field1 and field2
@@ -459,25 +1104,37 @@ class Constructible(object):
         f1: field1 --> field:  f1(x) == x
         f2: field2 --> field:  f2(x) == x
 
+        The results are cached in `join_cache` for each ordered pair of fields.
         """
-        # pylint: disable=function-redefined
-        Q = ()
+        field1 = Field.of(field1)
+        field2 = Field.of(field2)
+        key = (field1, field2)
+        result = join_cache.get(key)
+        if result is None:
+            field, f1, f2 = Constructible._join_fields(field1, field2)
+            result = (field, _preserving_fields(f1), _preserving_fields(f2))
+            join_cache.put(key, result)
+        return result
 
-        if field1 == Q:
+    @staticmethod
+    def _join_fields(field1, field2):
+        """uncached implementation of join_fields"""
+        # pylint: disable=function-redefined
+        if not field1:
             def f1(x):
-                assert x.field == field1
+                assert x.field is field1
                 return Constructible.lift_rational_field(x.a, field2)
             def f2(y):
-                assert y.field == field2
+                assert y.field is field2
                 return y
             return field2, f1, f2
 
-        if field2 == Q:
+        if not field2:
             def f1(x):
-                assert x.field == field1
+                assert x.field is field1
                 return x
             def f2(y):
-                assert y.field == field2
+                assert y.field is field2
                 return Constructible.lift_rational_field(y.a, field1)
             return field1, f1, f2
 
@@ -486,17 +1143,17 @@ class Constructible(object):
 
         s = f2_base(r)._try_sqrt()
         if s is None:
-            field = (f2_base(r), jbase)
+            field = Field(f2_base(r), jbase)
             def f1(x):
-                assert x.field == field1
+                assert x.field is field1
                 return Constructible(f1_base(x), Constructible.lift_rational_field(0, jbase), field)
             def f2(y):
-                assert y.field == field2
+                assert y.field is field2
                 return Constructible(f2_base(y.a), f2_base(y.b), field)
             return field, f1, f2
         else:
             def f2(y):
-                assert y.field == field2
+                assert y.field is field2
                 return f2_base(y.a) + f2_base(y.b) * s
             return jbase, f1_base, f2
 
@@ -509,12 +1166,13 @@ class Constructible(object):
         if not field:
             return Constructible(q)
         else:
-            zero = Constructible.lift_rational_field(0, field[1])
-            lift = Constructible.lift_rational_field(q, field[1])
+            zero = Constructible.lift_rational_field(0, field.base)
+            lift = Constructible.lift_rational_field(q, field.base)
             return Constructible(lift, zero, field)
 
 
     # taking square roots
+    @_preserving_fields
     def _try_sqrt(self):
         ''' try to compute the square root in the field itself.
 
@@ -522,9 +1180,13 @@ class Constructible(object):
         '''
         if not self.field:
             assert self.b == 0
-            root, remainder = fsqrt(self.a)
-            if remainder == 1:
-                return Constructible(root)
+            # only perfect squares matter here, so avoid factoring with fsqrt
+            if self.a < 0:
+                raise ValueError('math domain error %s' % self)
+            num = _int_sqrt(self.a.numerator)
+            den = _int_sqrt(self.a.denominator)
+            if num * num == self.a.numerator and den * den == self.a.denominator:
+                return Constructible(Fraction(num, den))
             else:
                 return None
 
@@ -542,17 +1204,47 @@ class Constructible(object):
         a = ((self.a + n) * Fraction(1, 2))._try_sqrt()
         if a is not None:
             result = Constructible(a, self.b / a * Fraction(1, 2), self.field)
-            assert result.field == self.field
+            assert result.field is self.field
             return result
 
         b = ((self.a + n) / self.r * Fraction(1, 2))._try_sqrt()
         if b is not None:
             result = Constructible(self.b / b * Fraction(1, 2), b, self.field)
-            assert result.field == self.field
+            assert result.field is self.field
             return result
 
         return None
 
+join_cache = LRUCache(maxsize=1024)
+
+# products and inverses in fields of at least this depth are computed with
+# integer coefficients and a common denominator (see _flat_mul), which avoids
+# the normalization of intermediate Fractions. None disables this.
+fraction_free_depth = 1
+# the common denominator is reduced when it grows beyond this number of bits
+_fraction_free_max_bits = 256
+# simplify the results of products and inverses of constructible numbers,
+# see Constructible.simplify
+auto_simplify = False
+_simplify_suspended = 0
+# elements are lifted with an embedding matrix of at most 2**_max_embedding_depth
+# entries, larger fields use the recursive maps of join_fields
+_max_embedding_depth = 12
+
+# precisions in bits tried by the interval arithmetic before falling back
+# to exact arithmetic when determining signs
+_interval_precisions = (64, 256, 1024)
+_basis_interval_cache = LRUCache(maxsize=256)
+_subtower_cache = LRUCache(maxsize=256)
+# the modular zero test (see _modular_differ) is used by == for operands in
+# different towers of rational radicands, with this number of primes
+modular_zero_test = True
+_modular_rounds = 3
+# number of primes tried before giving up, a prime is usable for a tower
+# with k prime factors in its radicands with probability about 2**-k
+_modular_max_primes = 64
+
+
 def sqrt(n):
     '''return the square root of n in an exact representation
     
@@ -562,6 +1254,10 @@ def sqrt(n):
     '''
     if isinstance(n, Rational):
         n = Constructible(n)
+    elif isinstance(n, MultiQuadratic):
+        n = n.to_constructible()
+    elif isinstance(n, Expression):
+        return n.sqrt()
     elif not isinstance(n, Constructible):
         raise ValueError('the square root is not implemented for the type %s' % type(n))
 
@@ -570,4 +1266,2076 @@ def sqrt(n):
         return r
     return Constructible(Constructible.lift_rational_field(0, n.field),
                          Constructible.lift_rational_field(1, n.field),
-                         (n, n.field))
+                         Field(n, n.field))
+
+
+def _coprime_base(numbers):
+    """return pairwise coprime integers such that each of the given square-free
+    integers is a product of some of them"""
+    base = []
+    for n in numbers:
+        refined = []
+        for b in base:
+            g = gcd(n, b)
+            if g == 1:
+                refined.append(b)
+            else:
+                refined.append(g)
+                if b != g:
+                    refined.append(b // g)
+                n //= g
+        if n != 1:
+            refined.append(n)
+        base = refined
+    return base
+
+
+class MultiQuadratic(object):
+    """Elements of multi-quadratic fields Q[sqrt(p1), ..., sqrt(pn)]
+
+    This is an alternative to Constructible for the common case that all
+    radicands are rational. An element is stored as a sparse coefficient
+    vector, mapping square-free integers m to the rational coefficient of
+    sqrt(m). The coefficient of the rational part is stored under m = 1.
+
+    Arithmetic does not need to build and recurse through a tower of fields,
+    which makes e.g. sums of many square roots much cheaper. MultiQuadratic
+    instances interoperate with Constructible instances, which are converted
+    to a MultiQuadratic if possible and otherwise take over the computation.
+    """
+    __slots__ = ('coefs', '_hash')
+
+    def __init__(self, value=0):
+        """constructs a MultiQuadratic instance.
+
+        value can be a Rational, a MultiQuadratic, a Constructible with only
+        rational radicands in its tower, or for internal use a dict mapping
+        square-free integers to their non-zero rational coefficients.
+        """
+        self._hash = None
+        if isinstance(value, dict):
+            self.coefs = value
+        elif isinstance(value, MultiQuadratic):
+            self.coefs = value.coefs
+        elif isinstance(value, Constructible):
+            self.coefs = MultiQuadratic.from_constructible(value).coefs
+        elif value:
+            self.coefs = {1: Fraction(value)}
+        else:
+            self.coefs = {}
+
+    @staticmethod
+    def sqrt(q):
+        """the square root of a non-negative rational q"""
+        a, b = fsqrt(Fraction(q))
+        if not a:
+            return MultiQuadratic()
+        return MultiQuadratic({b: Fraction(a)})
+
+    @staticmethod
+    def from_constructible(x):
+        """represent the Constructible x as a MultiQuadratic
+
+        raises ValueError if the tower of x has non-rational radicands.
+        """
+        if not x.field:
+            return MultiQuadratic(x.a)
+        r = x.r
+        while r.field:
+            if not r.b.is_zero:
+                raise ValueError('%s has a non-rational radicand' % (x,))
+            r = r.a
+        root = MultiQuadratic.sqrt(r.a)
+        return (MultiQuadratic.from_constructible(x.a) +
+                MultiQuadratic.from_constructible(x.b) * root)
+
+    def to_constructible(self):
+        """represent the instance as a Constructible"""
+        result = Constructible(0)
+        for m in sorted(self.coefs):
+            if m == 1:
+                result += self.coefs[m]
+            else:
+                result += self.coefs[m] * sqrt(m)
+        return result
+
+    @staticmethod
+    def _coerce(other):
+        """convert other to a MultiQuadratic, None if not possible"""
+        if isinstance(other, MultiQuadratic):
+            return other
+        if isinstance(other, Rational):
+            return MultiQuadratic(other)
+        if isinstance(other, Constructible):
+            try:
+                return MultiQuadratic.from_constructible(other)
+            except ValueError:
+                return None
+        return None
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.coefs)
+
+    def __str__(self):
+        if not self.coefs:
+            return '0'
+        terms = []
+        for m in sorted(self.coefs):
+            c = self.coefs[m]
+            if m == 1:
+                terms.append(str(c))
+            elif c == 1:
+                terms.append('sqrt(%d)' % m)
+            elif c == -1:
+                terms.append('-sqrt(%d)' % m)
+            else:
+                terms.append('%s * sqrt(%d)' % (c, m))
+        if len(terms) == 1:
+            return terms[0]
+        return '(%s)' % ' + '.join(terms).replace('+ -', '- ')
+
+    # Arithmetical Operators
+    def __pos__(self):
+        return self
+
+    def __neg__(self):
+        return MultiQuadratic({m: -c for m, c in self.coefs.items()})
+
+    def __add__(self, other):
+        y = MultiQuadratic._coerce(other)
+        if y is None:
+            if isinstance(other, Constructible):
+                return self.to_constructible() + other
+            return NotImplemented
+
+        coefs = dict(self.coefs)
+        for m, c in y.coefs.items():
+            c = coefs.get(m, 0) + c
+            if c:
+                coefs[m] = c
+            else:
+                coefs.pop(m, None)
+        return MultiQuadratic(coefs)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return other + (-self)
+
+    def __mul__(self, other):
+        y = MultiQuadratic._coerce(other)
+        if y is None:
+            if isinstance(other, Constructible):
+                return self.to_constructible() * other
+            return NotImplemented
+
+        coefs = {}
+        for m, c in self.coefs.items():
+            for n, d in y.coefs.items():
+                # sqrt(m) * sqrt(n) == g * sqrt(m * n / g**2)
+                g = gcd(m, n)
+                key = (m // g) * (n // g)
+                coefs[key] = coefs.get(key, 0) + c * d * g
+        return MultiQuadratic({m: c for m, c in coefs.items() if c})
+
+    __rmul__ = __mul__
+
+    def _conjugate(self, t):
+        """apply the automorphism changing the sign of sqrt(t)"""
+        return MultiQuadratic({m: -c if gcd(m, t) != 1 else c
+                               for m, c in self.coefs.items()})
+
+    def inverse(self):
+        """the multiplicative inverse of the instance"""
+        if not self.coefs:
+            raise ZeroDivisionError('division by zero')
+        # multiplying with the conjugate for each generator of the field
+        # eliminates that generator, until only a rational norm remains.
+        acc = MultiQuadratic(1)
+        y = self
+        for t in _coprime_base(m for m in self.coefs if m != 1):
+            conj = y._conjugate(t)
+            acc = acc * conj
+            y = y * conj
+        return acc * (1 / y.coefs[1])
+
+    def __truediv__(self, other):
+        y = MultiQuadratic._coerce(other)
+        if y is None:
+            if isinstance(other, Constructible):
+                return self.to_constructible() / other
+            return NotImplemented
+        return self * y.inverse()
+
+    def __rtruediv__(self, other):
+        return self.inverse() * other
+
+    __div__ = __truediv__
+    __rdiv__ = __rtruediv__
+
+    # equality and ordering
+    def _interval(self, prec):
+        """integers (lo, hi) such that lo <= self * 2**prec <= hi"""
+        lo = hi = 0
+        for m, c in self.coefs.items():
+            num, den = c.numerator, c.denominator
+            if m == 1:
+                slo = shi = 1 << prec
+            else:
+                slo = _int_sqrt(m << (2 * prec))
+                shi = slo + 1
+            if num < 0:
+                slo, shi = shi, slo
+            lo += num * slo // den
+            hi += -(-num * shi // den)
+        return lo, hi
+
+    def _sign(self):
+        """The sign of the instance, see Constructible._sign"""
+        if not self.coefs:
+            return 0
+        if len(self.coefs) == 1:
+            return 1 if next(iter(self.coefs.values())) > 0 else -1
+        for prec in _interval_precisions:
+            lo, hi = self._interval(prec)
+            if lo > 0:
+                return 1
+            if hi < 0:
+                return -1
+        return self.to_constructible()._sign()  # pylint: disable=protected-access
+
+    def _compare(self, other):
+        """the sign of self - other, None if other is not supported"""
+        y = MultiQuadratic._coerce(other)
+        if y is None:
+            if isinstance(other, Constructible):
+                return self.to_constructible()._compare(other)  # pylint: disable=protected-access
+            return None
+        return (self - y)._sign()
+
+    def __bool__(self):
+        return bool(self.coefs)
+
+    __nonzero__ = __bool__
+
+    def __eq__(self, other):
+        y = MultiQuadratic._coerce(other)
+        if y is None:
+            if isinstance(other, Constructible):
+                return self.to_constructible() == other
+            return NotImplemented
+        return self.coefs == y.coefs
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __lt__(self, other):
+        sign = self._compare(other)
+        return NotImplemented if sign is None else sign < 0
+
+    def __gt__(self, other):
+        sign = self._compare(other)
+        return NotImplemented if sign is None else sign > 0
+
+    def __le__(self, other):
+        sign = self._compare(other)
+        return NotImplemented if sign is None else sign <= 0
+
+    def __ge__(self, other):
+        sign = self._compare(other)
+        return NotImplemented if sign is None else sign >= 0
+
+    def __hash__(self):
+        if self._hash is None:
+            if not self.coefs or list(self.coefs) == [1]:
+                self._hash = hash(self.coefs.get(1, Fraction(0)))
+            else:
+                # must agree with the hash of the equal Constructible
+                self._hash = hash(self.to_constructible())
+        return self._hash
+
+    def __float__(self):
+        return sum(float(c) * math.sqrt(m) for m, c in self.coefs.items())
+
+
+# Flat integer representation
+#
+# An element of a field of depth k can be written as a vector of 2**k
+# rational coefficients with respect to the power basis of the tower.
+# The coefficients of x.a come first, followed by those of x.b.
+# The functions below work with integer vectors (of ints or of numpy arrays
+# of ints) and a common denominator, avoiding Fraction arithmetic.
+
+def _leaves(x):
+    """the rational coefficients of x in the power basis of its field"""
+    if not x.field:
+        return [x.a]
+    return _leaves(x.a) + _leaves(x.b)
+
+
+def _from_leaves(leaves, field):
+    """the Constructible in field with the given rational coefficients"""
+    if not field:
+        return Constructible(leaves[0])
+    half = len(leaves) // 2
+    return Constructible(_from_leaves(leaves[:half], field.base),
+                         _from_leaves(leaves[half:], field.base),
+                         field)
+
+
+def _to_flat(x):
+    """return integers (nums, den) with x == nums / den in the power basis"""
+    leaves = _leaves(x)
+    den = 1
+    for c in leaves:
+        den = den * c.denominator // gcd(den, c.denominator)
+    return [c.numerator * (den // c.denominator) for c in leaves], den
+
+
+def _flat_constants(field):
+    """return (R, dr, scale) for the flat arithmetic in field
+
+    r == R / dr is the radicand of field and scale is the factor by which
+    _flat_mul scales its products.
+    """
+    if field._flat is None:
+        R, dr = _to_flat(field.r)
+        scale = _flat_constants(field.base)[2] ** 2 * dr
+        field._flat = (R, dr, scale)
+    return field._flat
+
+
+def _basis_intervals(field, prec):
+    """enclosures (lo, hi) with lo <= b * 2**prec <= hi of the elements b
+    of the power basis of field, in the order of the flat representation"""
+    key = (field, prec)
+    result = _basis_interval_cache.get(key)
+    if result is None:
+        if not field:
+            result = [(1 << prec, 1 << prec)]
+        else:
+            rlo, rhi = field.r._interval(prec)
+            slo = _int_sqrt(max(rlo, 0) << prec)
+            shi = _int_sqrt(max(rhi, 0) << prec) + 1
+            base = _basis_intervals(field.base, prec)
+            result = base + [((lo * slo) >> prec, -(-(hi * shi) >> prec)) for lo, hi in base]
+        _basis_interval_cache.put(key, result)
+    return result
+
+
+def _used_levels(nums):
+    """bit mask of the levels of the tower occurring in the flat vector nums
+
+    Bit m of the index of a coefficient is set if its basis element contains
+    the square root of level m + 1 (level 1 extends the rationals).
+    """
+    used = 0
+    for index, n in enumerate(nums):
+        if n:
+            used |= index
+    return used
+
+
+def _compress(nums, mask):
+    """the flat vector nums restricted to the levels in mask"""
+    levels = [m for m in range(len(nums).bit_length() - 1) if mask >> m & 1]
+    result = [0] * (1 << len(levels))
+    for index, n in enumerate(nums):
+        if n:
+            new_index = 0
+            for p, m in enumerate(levels):
+                if index >> m & 1:
+                    new_index |= 1 << p
+            result[new_index] = n
+    return result
+
+
+def _subtower(field, mask):
+    """return (subfield, mask): the tower of the levels of field in mask,
+    extended by the levels the radicands of those levels need."""
+    fields = []
+    f = field
+    while f:
+        fields.append(f)
+        f = f.base
+    fields.reverse()
+    for m in reversed(range(len(fields))):
+        if mask >> m & 1:
+            mask |= _used_levels(fields[m].r._integer_coefficients()[0])
+
+    key = (field, mask)
+    result = _subtower_cache.get(key)
+    if result is None:
+        sub = _Q
+        for m, f in enumerate(fields):
+            if mask >> m & 1:
+                nums, den = f.r._integer_coefficients()
+                r = Constructible._from_ints(sub, _compress(nums, mask & ((1 << m) - 1)), den)
+                sub = Field(r, sub)
+        result = (sub, mask)
+        _subtower_cache.put(key, result)
+    return result
+
+
+def _is_zero_vector(x):
+    """whether the integer vector x is known to be zero"""
+    for c in x:
+        if (numpy is not None and isinstance(c, numpy.ndarray)) or c != 0:
+            return False
+    return True
+
+
+def _flat_mul(field, x, y):
+    """return the integer vector z with z == scale * x * y in field"""
+    if not field:
+        return [x[0] * y[0]]
+    base = field.base
+    R, dr, _ = _flat_constants(field)
+    if not base:
+        (xa, xb), (ya, yb), r = x, y, R[0]
+        return [xa * ya * dr + xb * yb * r, (xa * yb + xb * ya) * dr]
+    f = _flat_constants(base)[2] * dr
+    h = len(x) // 2
+    xa, xb, ya, yb = x[:h], x[h:], y[:h], y[h:]
+    # (xa + xb√r)(ya + yb√r) = (xa*ya + xb*yb*r) + (xa*yb + xb*ya)√r
+    if _is_zero_vector(xb):
+        return ([u * f for u in _flat_mul(base, xa, ya)] +
+                [u * f for u in _flat_mul(base, xa, yb)])
+    if _is_zero_vector(yb):
+        return ([u * f for u in _flat_mul(base, xa, ya)] +
+                [u * f for u in _flat_mul(base, xb, ya)])
+    # using three products in the base field for the four terms
+    p = _flat_mul(base, xa, ya)
+    q = _flat_mul(base, xb, yb)
+    m = _flat_mul(base, [u + v for u, v in zip(xa, xb)],
+                  [u + v for u, v in zip(ya, yb)])
+    qr = _flat_mul(base, q, R)
+    return ([u * f + v for u, v in zip(p, qr)] +
+            [(u - v - w) * f for u, v, w in zip(m, p, q)])
+
+
+def _flat_inverse(field, x, den):
+    """return (z, zden) with z / zden == den / x in field
+
+    raises ZeroDivisionError if x is zero.
+    """
+    if not field:
+        n = x[0]
+        if (n == 0) is True or getattr(n == 0, 'any', bool)():
+            raise ZeroDivisionError('division by zero')
+        return [den * ((n > 0) * 2 - 1)], abs(n)
+    base = field.base
+    R, dr, _ = _flat_constants(field)
+    bscale = _flat_constants(base)[2]
+    h = len(x) // 2
+    xa, xb = x[:h], x[h:]
+    # 1/(a+b√r) = (a-b√r) / (a*a - b*b*r)
+    aa = _flat_mul(base, xa, xa)
+    bbr = _flat_mul(base, _flat_mul(base, xb, xb), R)
+    norm = [u * (bscale * dr) - v for u, v in zip(aa, bbr)]
+    ninv, nden = _flat_inverse(base, norm, bscale * bscale * dr * den * den)
+    za = _flat_mul(base, xa, ninv)
+    zb = _flat_mul(base, xb, ninv)
+    return za + [-v for v in zb], bscale * den * nden
+
+
+def _embedding_matrix(source, target):
+    """the matrix of the embedding of source into target in the power bases
+
+    returns (rows, den) where rows is a list of the non-zero entries of each
+    row as pairs (column, integer numerator) with the common denominator den.
+    """
+    key = (source, target)
+    result = _embedding_cache.get(key)
+    if result is None:
+        _, _, embed = Constructible.join_fields(target, source)
+        size = 2 ** source.depth
+        columns = []
+        for i in range(size):
+            unit = [Fraction(int(i == j)) for j in range(size)]
+            columns.append(_leaves(embed(_from_leaves(unit, source))))
+        den = 1
+        for column in columns:
+            for c in column:
+                den = den * c.denominator // gcd(den, c.denominator)
+        rows = [[(j, c.numerator * (den // c.denominator)) for j, c in enumerate(row) if c]
+                for row in zip(*columns)]
+        result = (rows, den)
+        _embedding_cache.put(key, result)
+    return result
+
+
+def _embed_flat(nums, rows):
+    """apply the integer embedding matrix rows to the integer vector nums"""
+    result = []
+    for row in rows:
+        acc = 0
+        for j, c in row:
+            acc = acc + c * nums[j]
+        result.append(acc)
+    return result
+
+_embedding_cache = LRUCache(maxsize=1024)
+
+
+# Modular zero test
+#
+# For a prime p such that all radicands of a tower of rational radicands
+# have square roots modulo p, choosing a root for every prime factor of the
+# radicands gives a ring homomorphism from the field to the integers modulo
+# p (defined for elements whose denominator is not divisible by p). The
+# choice only depends on the prime factor, so the images of elements of
+# different towers are consistent. If the images of x and y differ, then
+# x != y. If they agree for several primes, x == y is likely, but this
+# still needs to be confirmed exactly.
+
+_modular_primes = []
+_prime_roots = {}
+_modular_images = LRUCache(maxsize=1024)
+
+
+def _modular_prime(i):
+    """the i-th largest prime below 2**61"""
+    p = _modular_primes[-1] - 2 if _modular_primes else (1 << 61) - 1
+    while len(_modular_primes) <= i:
+        if _is_prime(p):
+            _modular_primes.append(p)
+        p -= 2
+    return _modular_primes[i]
+
+
+def _sqrt_mod(a, p):
+    """a square root of a modulo the odd prime p (Tonelli-Shanks),
+    None if a is not a square"""
+    a %= p
+    if a == 0:
+        return 0
+    if pow(a, (p - 1) // 2, p) != 1:
+        return None
+    q, s = p - 1, 0
+    while q % 2 == 0:
+        q //= 2
+        s += 1
+    z = 2
+    while pow(z, (p - 1) // 2, p) != p - 1:
+        z += 1
+    m, c, t, r = s, pow(z, q, p), pow(a, q, p), pow(a, (q + 1) // 2, p)
+    while t != 1:
+        i, t2 = 0, t
+        while t2 != 1:
+            t2 = t2 * t2 % p
+            i += 1
+        b = pow(c, 1 << (m - i - 1), p)
+        m, c, t, r = i, b * b % p, t * b * b % p, r * b % p
+    return min(r, p - r)
+
+
+def _prime_root(q, p):
+    """the chosen square root of the prime q (or of -1) modulo p, None if
+    there is none"""
+    key = (q, p)
+    if key not in _prime_roots:
+        _prime_roots[key] = _sqrt_mod(q, p)
+    return _prime_roots[key]
+
+
+def _rational_root_mod(r, p):
+    """the image of sqrt(r) modulo p for a rational r, None if undefined"""
+    m = r.numerator * r.denominator
+    if m % p == 0:
+        return None
+    # sqrt(r) == sqrt(m) / denominator
+    root = pow(r.denominator, p - 2, p)
+    if m < 0:
+        m = -m
+        root = _prime_root(-1, p)
+        if root is None:
+            return None
+        root = root * pow(r.denominator, p - 2, p) % p
+    for q, e in _factorize(m).items():
+        if e % 2:
+            s = _prime_root(q, p)
+            if s is None:
+                return None
+            root = root * s % p
+        root = root * pow(q, e // 2, p) % p
+    return root
+
+
+def _field_images(field, p):
+    """the images modulo p of the power basis of a tower of rational
+    radicands, None if the tower has other radicands or p is not usable"""
+    key = (field, p)
+    result = _modular_images.get(key, False)
+    if result is False:
+        if not field:
+            result = [1]
+        else:
+            base = _field_images(field.base, p)
+            nums, den = field.r._integer_coefficients()  # pylint: disable=protected-access
+            result = None
+            if base is not None and not any(nums[1:]):
+                root = _rational_root_mod(Fraction(nums[0], den), p)
+                if root is not None:
+                    result = base + [b * root % p for b in base]
+        _modular_images.put(key, result)
+    return result
+
+
+def _modular_image(x, p):
+    """the image of x modulo p, None if undefined"""
+    images = _field_images(x.field, p)
+    if images is None:
+        return None
+    nums, den = x._integer_coefficients()  # pylint: disable=protected-access
+    if den % p == 0:
+        return None
+    return sum(n * b for n, b in zip(nums, images)) * pow(den, p - 2, p) % p
+
+
+def _rational_radicands(field):
+    """whether all radicands of the tower field are rational"""
+    while field:
+        if any(field.r._integer_coefficients()[0][1:]):  # pylint: disable=protected-access
+            return False
+        field = field.base
+    return True
+
+
+def _modular_differ(x, y):
+    """True if x != y is proven by the images modulo some primes, False if
+    the images agree for _modular_rounds primes, None if undecided"""
+    if not (_rational_radicands(x.field) and _rational_radicands(y.field)):
+        return None
+    rounds = 0
+    for i in range(_modular_max_primes):
+        p = _modular_prime(i)
+        a = _modular_image(x, p)
+        b = _modular_image(y, p) if a is not None else None
+        if b is None:
+            # p is not usable for x or y
+            continue
+        if a != b:
+            return True
+        rounds += 1
+        if rounds == _modular_rounds:
+            return False
+    return None
+
+
+class ConstructibleArray(object):
+    """A one-dimensional array of constructible numbers in a common field.
+
+    The elements are stored in the flat representation: one numpy array of
+    integer numerators for each of the 2**depth coefficients of the field
+    and one array of denominators shared by the coefficients of an element.
+    Arithmetic works on whole arrays at once and the operands are brought
+    into a common field only once per operation.
+
+    This class requires numpy.
+    """
+    __slots__ = ('field', 'nums', 'den')
+
+    def __init__(self, values=(), field=None):
+        """constructs an array from an iterable of Constructible or Rational
+        instances. The elements are embedded in field, by default in the
+        smallest common field found by Constructible.join_fields.
+        """
+        if numpy is None:
+            raise ImportError('ConstructibleArray requires numpy')
+        values = [v if isinstance(v, Constructible) else Constructible(v)
+                  for v in values]
+        field = _Q if field is None else Field.of(field)
+        for v in values:
+            if v.field is not field:
+                field = Constructible.join_fields(field, v.field)[0]
+
+        size = 2 ** field.depth
+        nums = [numpy.empty(len(values), dtype=object) for _ in range(size)]
+        den = numpy.empty(len(values), dtype=object)
+        for k, v in enumerate(values):
+            if v.field is not field:
+                v = Constructible.join_fields(field, v.field)[2](v)
+                assert v.field is field
+            vnums, den[k] = _to_flat(v)
+            for j in range(size):
+                nums[j][k] = vnums[j]
+        self.field = field
+        self.nums = nums
+        self.den = den
+
+    @staticmethod
+    def _new(field, nums, den):
+        """construct an array from flat data, reducing the fractions"""
+        result = object.__new__(ConstructibleArray)
+        g = den
+        for n in nums:
+            g = numpy.gcd(g, n)
+        g = numpy.where(g == 0, 1, g)
+        result.field = field
+        result.nums = [n // g for n in nums]
+        result.den = den // g
+        return result
+
+    def __len__(self):
+        return len(self.den)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ConstructibleArray._new(self.field, [n[index] for n in self.nums],
+                                           self.den[index])
+        den = self.den[index]
+        return _from_leaves([Fraction(n[index], den) for n in self.nums], self.field)
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+    def tolist(self):
+        """the elements as a list of Constructible instances"""
+        return list(self)
+
+    def __repr__(self):
+        return '%s([%s])' % (self.__class__.__name__, ', '.join(str(x) for x in self))
+
+    def lift(self, field):
+        """return the array embedded in an extension field of self.field"""
+        field = Field.of(field)
+        if field is self.field:
+            return self
+        rows, den = _embedding_matrix(self.field, field)
+        nums = [n * numpy.ones(len(self), dtype=object)
+                for n in _embed_flat(self.nums, rows)]
+        return ConstructibleArray._new(field, nums, self.den * den)
+
+    def _align(self, other):
+        """return (field, xnums, xden, ynums, yden) for self and other in a
+        common field, other can be an array or a scalar."""
+        if isinstance(other, ConstructibleArray):
+            if len(other) != len(self):
+                raise ValueError('arrays of different length %d and %d' %
+                                 (len(self), len(other)))
+            field = self.field
+            if other.field is not field:
+                field = Constructible.join_fields(field, other.field)[0]
+            x, y = self.lift(field), other.lift(field)
+            return field, x.nums, x.den, y.nums, y.den
+
+        if isinstance(other, Rational):
+            other = Constructible(other)
+        elif not isinstance(other, Constructible):
+            return None
+        field = self.field
+        if other.field is not field:
+            field = Constructible.join_fields(field, other.field)[0]
+        x = self.lift(field)
+        other = Constructible.join_fields(field, other.field)[2](other)
+        ynums, yden = _to_flat(other)
+        return field, x.nums, x.den, ynums, yden
+
+    # Arithmetical Operators
+    def __pos__(self):
+        return self
+
+    def __neg__(self):
+        return ConstructibleArray._new(self.field, [-n for n in self.nums], self.den)
+
+    def __add__(self, other):
+        aligned = self._align(other)
+        if aligned is None:
+            return NotImplemented
+        field, x, dx, y, dy = aligned
+        return ConstructibleArray._new(field, [u * dy + v * dx for u, v in zip(x, y)],
+                                       dx * dy)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return (-self) + other
+
+    def __mul__(self, other):
+        aligned = self._align(other)
+        if aligned is None:
+            return NotImplemented
+        field, x, dx, y, dy = aligned
+        scale = _flat_constants(field)[2]
+        return ConstructibleArray._new(field, _flat_mul(field, x, y), dx * dy * scale)
+
+    __rmul__ = __mul__
+
+    def inverse(self):
+        """the elementwise multiplicative inverse"""
+        zero = numpy.logical_and.reduce([n == 0 for n in self.nums])
+        if numpy.any(zero):
+            raise ZeroDivisionError('element %d of the array is zero' %
+                                    numpy.nonzero(zero)[0][0])
+        nums, den = _flat_inverse(self.field, self.nums, self.den)
+        return ConstructibleArray._new(self.field, nums, den)
+
+    def __truediv__(self, other):
+        if isinstance(other, ConstructibleArray):
+            return self * other.inverse()
+        if isinstance(other, (Constructible, Rational)):
+            return self * (1 / other)
+        return NotImplemented
+
+    def __rtruediv__(self, other):
+        return self.inverse() * other
+
+    __div__ = __truediv__
+    __rdiv__ = __rtruediv__
+
+    # equality and ordering
+    def _basis_floats(self):
+        """float values of the power basis of self.field"""
+        basis = [1.0]
+        fields = []
+        field = self.field
+        while field:
+            fields.append(field)
+            field = field.base
+        for field in reversed(fields):
+            root = math.sqrt(float(field.r))
+            basis = basis + [b * root for b in basis]
+        return basis
+
+    def _terms(self):
+        """float arrays of the terms coefficient * basis element"""
+        return [numpy.asarray(n / self.den, dtype=float) * b
+                for n, b in zip(self.nums, self._basis_floats())]
+
+    def to_float(self):
+        """the elements as a numpy array of floats"""
+        return sum(self._terms())
+
+    def signs(self):
+        """the signs of the elements as a numpy array of -1, 0 and 1
+
+        The signs are determined from floats where the rounding error can
+        not matter, and exactly for the remaining elements.
+        """
+        terms = self._terms()
+        approx = sum(terms)
+        bound = sum(abs(t) for t in terms) * (len(terms) * 1e-12)
+        result = numpy.where(approx > bound, 1, numpy.where(approx < -bound, -1, 0))
+        for k in numpy.nonzero(result == 0)[0]:
+            result[k] = self[int(k)]._sign()  # pylint: disable=protected-access
+        return result
+
+    def __eq__(self, other):
+        difference = self - other
+        return numpy.logical_and.reduce([n == 0 for n in difference.nums])
+
+    def __ne__(self, other):
+        return ~(self == other)
+
+    def __lt__(self, other):
+        return (self - other).signs() < 0
+
+    def __gt__(self, other):
+        return (self - other).signs() > 0
+
+    def __le__(self, other):
+        return (self - other).signs() <= 0
+
+    def __ge__(self, other):
+        return (self - other).signs() >= 0
+
+    __hash__ = None
+
+
+# Primitive element representation
+
+def _poly_trim(p):
+    """remove the leading zero coefficients of the polynomial p (a list)"""
+    while p and p[-1] == 0:
+        p.pop()
+    return p
+
+
+def _is_squarefree(poly):
+    """whether the rational polynomial poly has no multiple roots,
+    i.e. gcd(poly, poly') == 1"""
+    p = _poly_trim([Fraction(c) for c in poly])
+    q = _poly_trim([k * c for k, c in enumerate(p)][1:])
+    while q:
+        # p, q = q, p mod q
+        p = list(p)
+        while len(p) >= len(q):
+            factor = p[-1] / q[-1]
+            shift = len(p) - len(q)
+            for i, c in enumerate(q):
+                p[shift + i] -= factor * c
+            p.pop()
+            _poly_trim(p)
+        p, q = q, p
+    return len(p) == 1
+
+
+class PrimitiveField(object):
+    """A tower of quadratic extensions represented by a primitive element.
+
+    PrimitiveField(field) finds theta = sum(t**m * sqrt(r_m)) over the levels m
+    of the tower, with the smallest t making theta generate the whole field.
+    Its minimal polynomial is scaled to a monic integer polynomial (the
+    modulus), and the elements of the field are represented as polynomials
+    in theta reduced modulo the modulus, with integer coefficients and a
+    common denominator (see PrimitiveElement).
+
+    A product is one polynomial multiplication and reduction, independent of
+    the structure of the tower. Setting up the field costs a change of basis
+    of size 2**depth, so this pays off for many operations in one field.
+    The coefficients with respect to the powers of theta can be much larger
+    than those in the tower, especially for nested radicands, so it is worth
+    measuring both representations for a given computation.
+    """
+    __slots__ = ('field', 'theta', 'modulus', '_basis', '_inverse_basis')
+
+    def __init__(self, field):
+        field = Field.of(field)
+        depth = field.depth
+        n = 1 << depth
+        generators = []
+        for m in range(depth):
+            nums = [0] * n
+            nums[1 << m] = 1
+            generators.append(Constructible._from_ints(field, nums, 1))  # pylint: disable=protected-access
+
+        t = 1
+        while True:
+            theta = Constructible.lift_rational_field(0, field)
+            for m, g in enumerate(generators):
+                theta += g * t ** m
+            poly = theta.minpoly()
+            if _is_squarefree(poly):
+                break
+            t += 1
+
+        # scale theta by the smallest d making its minimal polynomial, which
+        # becomes d**(n-i) * poly[i], monic with integer coefficients
+        exponents = {}
+        for i, c in enumerate(poly[:-1]):
+            for p, e in _factorize(c.denominator).items():
+                exponents[p] = max(exponents.get(p, 0), -(-e // (n - i)))
+        d = 1
+        for p, e in exponents.items():
+            d *= p ** e
+        self.field = field
+        self.theta = theta * d
+        self.modulus = [int(c * d ** (n - i)) for i, c in enumerate(poly)]
+
+        # columns: the flat representations of the powers of theta
+        columns = []
+        power = Constructible.lift_rational_field(1, field)
+        for _ in range(n):
+            columns.append(_leaves(power))
+            power = power * self.theta
+        rows = [[columns[j][i] for j in range(n)] for i in range(n)]
+        self._basis = _integer_matrix(rows)
+        self._inverse_basis = _integer_matrix(
+            [[x.a for x in row] for row in Matrix(rows).inverse().rows])
+
+    @property
+    def degree(self):
+        """the degree of the field over the rationals"""
+        return len(self.modulus) - 1
+
+    def __repr__(self):
+        return 'PrimitiveField(%r)' % (self.field,)
+
+    def element(self, x):
+        """represent the Constructible or Rational x as a PrimitiveElement"""
+        if isinstance(x, PrimitiveElement):
+            if x.domain is not self:
+                raise ValueError('element of a different PrimitiveField')
+            return x
+        if not isinstance(x, Constructible):
+            x = Constructible(x)
+        if x.field is not self.field:
+            field, _, embed = Constructible.join_fields(self.field, x.field)
+            if field is not self.field:
+                raise ValueError('%s is not an element of the field' % (x,))
+            x = embed(x)
+        nums, den = x._integer_coefficients()  # pylint: disable=protected-access
+        rows, rows_den = self._inverse_basis
+        return PrimitiveElement._new(self, [sum(a * b for a, b in zip(row, nums)) for row in rows],
+                                     den * rows_den)
+
+    def _reduce(self, poly):
+        """the integer polynomial poly reduced modulo the monic modulus"""
+        modulus = self.modulus
+        n = len(modulus) - 1
+        poly = list(poly) + [0] * (n - len(poly))
+        for i in range(len(poly) - 1, n - 1, -1):
+            c = poly[i]
+            if c:
+                for j in range(n):
+                    poly[i - n + j] -= c * modulus[j]
+        return poly[:n]
+
+
+def _integer_matrix(rows):
+    """return (integer rows, den) for a matrix of rationals"""
+    den = 1
+    for row in rows:
+        for c in row:
+            den = den * c.denominator // gcd(den, c.denominator)
+    return [[int(c * den) for c in row] for row in rows], den
+
+
+class PrimitiveElement(object):
+    """An element nums(theta) / den of a PrimitiveField.
+
+    Use PrimitiveField.element to construct instances and to_constructible
+    to convert back. Operands must belong to the same PrimitiveField or be
+    rational numbers.
+    """
+    __slots__ = ('domain', 'nums', 'den')
+
+    @staticmethod
+    def _new(domain, nums, den):
+        result = object.__new__(PrimitiveElement)
+        g = den
+        for n in nums:
+            g = gcd(g, n)
+        if g != 1:
+            nums = [n // g for n in nums]
+            den //= g
+        result.domain = domain
+        result.nums = nums
+        result.den = den
+        return result
+
+    def to_constructible(self):
+        """the element as a Constructible in domain.field"""
+        rows, rows_den = self.domain._basis  # pylint: disable=protected-access
+        nums = [sum(a * b for a, b in zip(row, self.nums)) for row in rows]
+        return Constructible._from_ints(self.domain.field, nums, self.den * rows_den)  # pylint: disable=protected-access
+
+    def _coerce(self, other):
+        if isinstance(other, PrimitiveElement):
+            if other.domain is not self.domain:
+                raise ValueError('elements of different PrimitiveFields')
+            return other
+        if isinstance(other, (Rational, Constructible)):
+            return self.domain.element(other)
+        return None
+
+    def __repr__(self):
+        return 'PrimitiveElement(%s)' % (self.to_constructible(),)
+
+    def __str__(self):
+        return str(self.to_constructible())
+
+    # Arithmetical Operators
+    def __pos__(self):
+        return self
+
+    def __neg__(self):
+        return PrimitiveElement._new(self.domain, [-n for n in self.nums], self.den)
+
+    def __add__(self, other):
+        other = self._coerce(other)
+        if other is None:
+            return NotImplemented
+        return PrimitiveElement._new(
+            self.domain, [a * other.den + b * self.den for a, b in zip(self.nums, other.nums)],
+            self.den * other.den)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        other = self._coerce(other)
+        if other is None:
+            return NotImplemented
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return (-self) + other
+
+    def __mul__(self, other):
+        if isinstance(other, Rational):
+            other = Fraction(other)
+            return PrimitiveElement._new(self.domain, [n * other.numerator for n in self.nums],
+                                         self.den * other.denominator)
+        other = self._coerce(other)
+        if other is None:
+            return NotImplemented
+        product = _int_poly_mul(self.nums, other.nums)
+        return PrimitiveElement._new(self.domain, self.domain._reduce(product),  # pylint: disable=protected-access
+                                     self.den * other.den)
+
+    __rmul__ = __mul__
+
+    def inverse(self):
+        """the multiplicative inverse, computed in the tower"""
+        return self.domain.element(self.to_constructible().inverse())
+
+    def __truediv__(self, other):
+        if isinstance(other, Rational):
+            return self * (1 / Fraction(other))
+        other = self._coerce(other)
+        if other is None:
+            return NotImplemented
+        return self * other.inverse()
+
+    def __rtruediv__(self, other):
+        return self.inverse() * other
+
+    __div__ = __truediv__
+    __rdiv__ = __rtruediv__
+
+    # equality
+    def __eq__(self, other):
+        if isinstance(other, PrimitiveElement) and other.domain is self.domain:
+            return self.nums == other.nums and self.den == other.den
+        if isinstance(other, (Rational, Constructible, PrimitiveElement)):
+            return self.to_constructible() == (
+                other.to_constructible() if isinstance(other, PrimitiveElement) else other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __hash__(self):
+        return hash(self.to_constructible())
+
+    def __float__(self):
+        return float(self.to_constructible())
+
+
+# Sorting
+
+class SortKey(object):
+    """A key for sorting constructible numbers, see sort_key"""
+    __slots__ = ('value', 'lo', 'hi')
+
+    def __init__(self, value):
+        if not isinstance(value, Constructible):
+            value = Constructible(value)
+        self.value = value
+        self.lo, self.hi = value._interval(_interval_precisions[0])  # pylint: disable=protected-access
+
+    def __lt__(self, other):
+        if self.hi < other.lo:
+            return True
+        if self.lo > other.hi:
+            return False
+        return self.value._compare(other.value) < 0  # pylint: disable=protected-access
+
+
+def sort_key(x):
+    """a key for sorted and list.sort comparing the cached enclosures of the
+    numbers first and exactly only if they overlap
+
+        sorted(values, key=sort_key)
+    """
+    return SortKey(x)
+
+
+def sorted_exact(iterable, key=None, reverse=False):
+    """return a new sorted list of the constructible numbers in iterable
+
+    Like sorted, with key a function returning a Constructible or Rational.
+    The numbers are sorted by their enclosures, which are computed once per
+    element. Exact comparisons are only made within groups of elements with
+    overlapping enclosures. The sort is stable.
+    """
+    items = []
+    for index, x in enumerate(iterable):
+        items.append((SortKey(x if key is None else key(x)), index, x))
+    items.sort(key=lambda item: item[0].lo)
+
+    def exact(item1, item2):
+        x, y = item1[0].value, item2[0].value
+        if x.field is y.field:
+            # subtraction in a common field is cheap, more precise
+            # enclosures would not separate equal numbers
+            return (x - y)._sign()  # pylint: disable=protected-access
+        return x._compare(y)  # pylint: disable=protected-access
+
+    # split into clusters of overlapping enclosures
+    clusters = []
+    hi = None
+    for item in items:
+        if hi is None or item[0].lo > hi:
+            clusters.append([item])
+            hi = item[0].hi
+        else:
+            clusters[-1].append(item)
+            hi = max(hi, item[0].hi)
+
+    if reverse:
+        clusters.reverse()
+    result = []
+    for cluster in clusters:
+        if len(cluster) > 1:
+            cluster.sort(key=lambda item: item[1])
+            cluster.sort(key=cmp_to_key(exact), reverse=reverse)
+        result.extend(item[2] for item in cluster)
+    return result
+
+
+# Batch operations
+
+def _common_field(values):
+    """the values as Constructible instances in their smallest common field"""
+    values = [v if isinstance(v, Constructible) else Constructible(v) for v in values]
+    field = _Q
+    for v in values:
+        if v.field is not field:
+            field = Constructible.join_fields(field, v.field)[0]
+    return [v if v.field is field else Constructible.join_fields(field, v.field)[2](v)
+            for v in values]
+
+
+def batch_inverse(iterable):
+    """return the list of the inverses of the numbers in iterable
+
+    All numbers are brought into a common field once. A ZeroDivisionError
+    names the index of the first zero element.
+    """
+    values = _common_field(iterable)
+    for k, v in enumerate(values):
+        if v.is_zero:
+            raise ZeroDivisionError('element %d of the batch is zero' % k)
+    return [v.inverse() for v in values]
+
+
+def batch_divide(numerators, denominators):
+    """return the list of the quotients numerators[k] / denominators[k]
+
+    All numbers are brought into a common field once. A ZeroDivisionError
+    names the index of the first zero denominator.
+    """
+    numerators = list(numerators)
+    denominators = list(denominators)
+    if len(numerators) != len(denominators):
+        raise ValueError('%d numerators but %d denominators' %
+                         (len(numerators), len(denominators)))
+    values = _common_field(numerators + denominators)
+    inverses = batch_inverse(values[len(numerators):])
+    return [x * y for x, y in zip(values, inverses)]
+
+
+# Linear algebra
+
+def _coefficient_size(x):
+    """the number of bits in the flat representation of x, a cheap measure
+    for the cost of arithmetic with x"""
+    if not x.field:
+        return x.a.numerator.bit_length() + x.a.denominator.bit_length()
+    nums, den = x._integer_coefficients()  # pylint: disable=protected-access
+    return sum(int(n).bit_length() for n in nums) + int(den).bit_length()
+
+
+def _bareiss(rows, pivot_columns):
+    """fraction-free Gaussian elimination of rows (lists of Constructible
+    instances in a common field), pivoting in the first pivot_columns columns
+
+    returns (rows, pivots, sign): the rows in echelon form, the list of
+    (row, column) positions of the pivots and the sign of the row permutation.
+    Each entry is a minor of the original matrix, the only division in a
+    step is by the previous pivot.
+    """
+    rows = [list(row) for row in rows]
+    if not rows:
+        return rows, [], 1
+    field = rows[0][0].field if rows[0] else _Q
+    zero = Constructible.lift_rational_field(0, field)
+    prev_inverse = None
+    pivots = []
+    sign = 1
+    r = 0
+    for c in range(pivot_columns):
+        if r == len(rows):
+            break
+        # the zero test is exact and free: the representation is unique
+        candidates = [i for i in range(r, len(rows)) if not rows[i][c].is_zero]
+        if not candidates:
+            continue
+        p = min(candidates, key=lambda i: _coefficient_size(rows[i][c]))
+        if p != r:
+            rows[p], rows[r] = rows[r], rows[p]
+            sign = -sign
+        pivots.append((r, c))
+        pivot, pivot_row = rows[r][c], rows[r]
+        for row in rows[r + 1:]:
+            factor = row[c]
+            for j in range(c + 1, len(row)):
+                x = pivot * row[j]
+                if not factor.is_zero:
+                    x = x - factor * pivot_row[j]
+                row[j] = x if prev_inverse is None else x * prev_inverse
+            row[c] = zero
+        prev_inverse = pivot.inverse()
+        r += 1
+    return rows, pivots, sign
+
+
+class Matrix(object):
+    """A matrix of constructible numbers.
+
+    All entries are brought into a common field when the matrix is
+    constructed. Determinant, rank, solve and inverse use fraction-free
+    (Bareiss) elimination, which keeps the entries small.
+    """
+    __slots__ = ('rows', 'field')
+
+    def __init__(self, rows):
+        """constructs a matrix from a sequence of rows of Constructible or
+        Rational instances."""
+        rows = [list(row) for row in rows]
+        ncols = len(rows[0]) if rows else 0
+        if any(len(row) != ncols for row in rows):
+            raise ValueError('rows of different length')
+        values = _common_field(x for row in rows for x in row)
+        self.rows = [values[k * ncols:(k + 1) * ncols] for k in range(len(rows))]
+        self.field = values[0].field if values else _Q
+
+    @staticmethod
+    def identity(n):
+        """the n times n identity matrix"""
+        return Matrix([[int(i == j) for j in range(n)] for i in range(n)])
+
+    @property
+    def nrows(self):
+        return len(self.rows)
+
+    @property
+    def ncols(self):
+        return len(self.rows[0]) if self.rows else 0
+
+    def __getitem__(self, index):
+        i, j = index
+        return self.rows[i][j]
+
+    def tolist(self):
+        """the entries as a list of rows"""
+        return [list(row) for row in self.rows]
+
+    def __repr__(self):
+        return 'Matrix([%s])' % ', '.join(
+            '[%s]' % ', '.join(str(x) for x in row) for row in self.rows)
+
+    def __eq__(self, other):
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        return self.rows == other.rows
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __mul__(self, other):
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        if self.ncols != other.nrows:
+            raise ValueError('can not multiply %dx%d and %dx%d matrices' %
+                             (self.nrows, self.ncols, other.nrows, other.ncols))
+        columns = list(zip(*other.rows))
+        return Matrix([[sum((x * y for x, y in zip(row, column)), 0) for column in columns]
+                       for row in self.rows])
+
+    def echelon_form(self):
+        """return (matrix, pivots): a row echelon form of the matrix computed by
+        fraction-free elimination and the (row, column) positions of the pivots.
+
+        Among the non-zero candidates in a column the entry with the smallest
+        coefficients is chosen as pivot.
+        """
+        rows, pivots, _ = _bareiss(self.rows, self.ncols)
+        return Matrix(rows), pivots
+
+    def rank(self):
+        """the rank of the matrix"""
+        return len(_bareiss(self.rows, self.ncols)[1])
+
+    def _check_square(self):
+        if self.nrows != self.ncols:
+            raise ValueError('matrix is not square (%dx%d)' % (self.nrows, self.ncols))
+
+    def determinant(self):
+        """the determinant of a square matrix"""
+        self._check_square()
+        if not self.rows:
+            return Constructible(1)
+        rows, pivots, sign = _bareiss(self.rows, self.ncols)
+        if len(pivots) < self.nrows:
+            return Constructible(0)
+        det = rows[-1][-1]
+        return det if sign > 0 else -det
+
+    def solve(self, b):
+        """return x with self * x == b for a square non-singular matrix
+
+        b is a list of numbers (the result is a list) or a Matrix with
+        self.nrows rows (the result is a Matrix).
+        """
+        self._check_square()
+        vector = not isinstance(b, Matrix)
+        b = Matrix([[x] for x in b]) if vector else b
+        if b.nrows != self.nrows:
+            raise ValueError('right hand side has %d rows, expected %d' %
+                             (b.nrows, self.nrows))
+        n = self.nrows
+        values = _common_field([x for row in self.rows for x in row] +
+                               [x for row in b.rows for x in row])
+        m = b.ncols
+        rows = [values[i * n:(i + 1) * n] + values[n * n + i * m:n * n + (i + 1) * m]
+                for i in range(n)]
+        rows, pivots, _ = _bareiss(rows, n)
+        if len(pivots) < n:
+            raise ZeroDivisionError('matrix is singular')
+
+        # back substitution, the only divisions are by the diagonal
+        inverses = batch_inverse([rows[i][i] for i in range(n)])
+        x = [None] * n
+        for i in reversed(range(n)):
+            row = rows[i]
+            x[i] = [row[n + k] for k in range(m)]
+            for j in range(i + 1, n):
+                if not row[j].is_zero:
+                    x[i] = [s - row[j] * t for s, t in zip(x[i], x[j])]
+            x[i] = [s * inverses[i] for s in x[i]]
+        if vector:
+            return [s[0] for s in x]
+        return Matrix(x)
+
+    def inverse(self):
+        """the inverse of a square non-singular matrix"""
+        return self.solve(Matrix.identity(self.nrows))
+
+
+# Lazy expressions
+
+_expressions = weakref.WeakValueDictionary()
+
+
+class Expression(object):
+    """A lazily evaluated arithmetic expression of constructible numbers.
+
+    Operators on expressions (see lazy) build a graph instead of computing
+    the result. The nodes are hash-consed, so equal subexpressions built from
+    the same operands are the same node and are only evaluated once.
+    Evaluation happens on demand (evaluate, comparisons, float, str, hash),
+    the constants of the whole graph are lifted into their common field once
+    before evaluating.
+    """
+    __slots__ = ('op', 'args', '_value', '__weakref__')
+
+    def __new__(cls, op, *args):
+        if op == 'const':
+            value = args[0]
+            key = (op, value.field, _structural_key(value))
+        else:
+            if op in ('add', 'mul'):
+                args = tuple(sorted(args, key=id))
+            key = (op,) + tuple(id(arg) for arg in args)
+        node = _expressions.get(key)
+        if node is None:
+            node = object.__new__(cls)
+            node.op = op
+            node.args = args
+            node._value = None
+            _expressions[key] = node
+        return node
+
+    @staticmethod
+    def _wrap(x):
+        """x as an Expression, None if not possible"""
+        if isinstance(x, Expression):
+            return x
+        if isinstance(x, Rational):
+            x = Constructible(x)
+        if isinstance(x, Constructible):
+            return Expression('const', x)
+        return None
+
+    def _nodes(self):
+        """the nodes of the graph in an order where arguments come first"""
+        order, seen = [], set()
+        stack = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                order.append(node)
+            elif id(node) not in seen and node._value is None:
+                seen.add(id(node))
+                stack.append((node, True))
+                if node.op != 'const':
+                    stack.extend((arg, False) for arg in node.args)
+        return order
+
+    def evaluate(self):
+        """the value of the expression as a Constructible"""
+        if self._value is not None:
+            return self._value
+        nodes = self._nodes()
+
+        # join the fields of all constants once
+        field = _Q
+        for node in nodes:
+            if node.op == 'const' and node.args[0].field is not field:
+                field = Constructible.join_fields(field, node.args[0].field)[0]
+
+        values = {}
+        for node in nodes:
+            args = [values[id(arg)] if id(arg) in values else arg._value
+                    for arg in node.args] if node.op != 'const' else None
+            if node.op == 'const':
+                value = node.args[0]
+                if value.field is not field:
+                    _, _, embed = Constructible.join_fields(field, value.field)
+                    value = value._embed(field, embed)
+            elif node.op == 'add':
+                value = args[0] + args[1]
+            elif node.op == 'sub':
+                value = args[0] - args[1]
+            elif node.op == 'mul':
+                value = args[0] * args[1]
+            elif node.op == 'div':
+                value = args[0] / args[1]
+            elif node.op == 'neg':
+                value = -args[0]
+            elif node.op == 'sqrt':
+                value = sqrt(args[0])
+            else:
+                raise ValueError('unknown operation %r' % node.op)
+            values[id(node)] = value
+            if node.op != 'const':
+                # constants keep the field they were given in
+                node._value = value
+        return values[id(self)] if id(self) in values else self._value
+
+    def __repr__(self):
+        return 'lazy(%r)' % (self.evaluate(),)
+
+    def __str__(self):
+        return str(self.evaluate())
+
+    # Arithmetical Operators
+    def _binary(self, op, other, reflected=False):
+        other = Expression._wrap(other)
+        if other is None:
+            return NotImplemented
+        if reflected:
+            return Expression(op, other, self)
+        return Expression(op, self, other)
+
+    def __pos__(self):
+        return self
+
+    def __neg__(self):
+        return Expression('neg', self)
+
+    def __add__(self, other):
+        return self._binary('add', other)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self._binary('sub', other)
+
+    def __rsub__(self, other):
+        return self._binary('sub', other, reflected=True)
+
+    def __mul__(self, other):
+        return self._binary('mul', other)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        return self._binary('div', other)
+
+    def __rtruediv__(self, other):
+        return self._binary('div', other, reflected=True)
+
+    __div__ = __truediv__
+    __rdiv__ = __rtruediv__
+
+    def sqrt(self):
+        """the lazily evaluated square root"""
+        return Expression('sqrt', self)
+
+    # evaluating operations
+    def _other_value(self, other):
+        if isinstance(other, Expression):
+            return other.evaluate()
+        return other
+
+    def __eq__(self, other):
+        return self.evaluate() == self._other_value(other)
+
+    def __ne__(self, other):
+        return self.evaluate() != self._other_value(other)
+
+    def __lt__(self, other):
+        return self.evaluate() < self._other_value(other)
+
+    def __gt__(self, other):
+        return self.evaluate() > self._other_value(other)
+
+    def __le__(self, other):
+        return self.evaluate() <= self._other_value(other)
+
+    def __ge__(self, other):
+        return self.evaluate() >= self._other_value(other)
+
+    def __bool__(self):
+        return bool(self.evaluate())
+
+    __nonzero__ = __bool__
+
+    def __hash__(self):
+        return hash(self.evaluate())
+
+    def __float__(self):
+        return float(self.evaluate())
+
+
+def lazy(x):
+    """wrap a Constructible or Rational in a lazily evaluated Expression"""
+    result = Expression._wrap(x)  # pylint: disable=protected-access
+    if result is None:
+        raise TypeError('can not make a lazy expression from %s' % type(x))
+    return result
+
+
+# Parallel evaluation
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:  # Python 2
+    ProcessPoolExecutor = None
+
+
+def parallel_map(func, iterable, max_workers=None, chunksize=None):
+    """return the list [func(x) for x in iterable] computed in a process pool
+
+    The inputs are sent to the worker processes in chunks of chunksize
+    items. Each chunk is pickled as a whole, so a field shared by the
+    elements of a chunk is transferred only once. func must be picklable,
+    i.e. defined at the top level of a module.
+
+    Without concurrent.futures (Python 2) the map is computed serially.
+    """
+    items = list(iterable)
+    if ProcessPoolExecutor is None or max_workers == 1 or len(items) < 2:
+        return [func(x) for x in items]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        if chunksize is None:
+            workers = getattr(executor, '_max_workers', 1)
+            chunksize = max(1, len(items) // (4 * workers))
+        return list(executor.map(func, items, chunksize=chunksize))
+
+
+# Binary serialization
+#
+# A file starts with the magic bytes b'CNST' and the format version as
+# varint, followed by records. Each record is a tag byte, the length of the
+# payload as varint and the payload:
+#
+#   _FIELD_RECORD:    index of the base field, radicand coefficients
+#   _ELEMENT_RECORD:  index of the field, coefficients
+#
+# Fields are numbered in the order of their definition starting with 1, the
+# index 0 is the field of rationals. A field is defined once, before the
+# first record which refers to it. Coefficients are the denominator as
+# varint followed by the 2**depth numerators of the flat representation
+# as zigzag encoded varints.
+
+_MAGIC = b'CNST'
+_FORMAT_VERSION = 1
+_FIELD_RECORD = 1
+_ELEMENT_RECORD = 2
+
+
+def _encode_varint(n, out):
+    """append the unsigned integer n to the bytearray out"""
+    while n > 0x7f:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _decode_varint(data, pos):
+    """return the unsigned integer at data[pos:] and the position after it"""
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _encode_coefficients(x, out):
+    nums, den = x._integer_coefficients()  # pylint: disable=protected-access
+    g = den
+    for n in nums:
+        g = gcd(g, n)
+    _encode_varint(int(den // g), out)
+    for n in nums:
+        n = int(n // g)
+        _encode_varint(2 * n if n >= 0 else -2 * n - 1, out)
+
+
+def _decode_coefficients(field, data, pos):
+    den, pos = _decode_varint(data, pos)
+    nums = []
+    for _ in range(1 << field.depth):
+        n, pos = _decode_varint(data, pos)
+        nums.append(n >> 1 if not n & 1 else -(n >> 1) - 1)
+    return Constructible._from_ints(field, nums, den), pos  # pylint: disable=protected-access
+
+
+def _record(tag, payload):
+    out = bytearray([tag])
+    _encode_varint(len(payload), out)
+    out += payload
+    return bytes(out)
+
+
+def dump_iter(iterable):
+    """encode the constructible numbers in iterable, yielding chunks of bytes
+
+    The chunks concatenated are a file readable by load_iter and
+    ConstructibleReader. Each distinct field is encoded only once.
+    """
+    out = bytearray(_MAGIC)
+    _encode_varint(_FORMAT_VERSION, out)
+    yield bytes(out)
+
+    indices = {_Q: 0}
+
+    def define(field, records):
+        """append the records defining field and its base fields if needed"""
+        if field in indices:
+            return
+        define(field.base, records)
+        payload = bytearray()
+        _encode_varint(indices[field.base], payload)
+        _encode_coefficients(field.r, payload)
+        indices[field] = len(indices)
+        records.append(_record(_FIELD_RECORD, payload))
+
+    for x in iterable:
+        if not isinstance(x, Constructible):
+            x = Constructible(x)
+        records = []
+        define(x.field, records)
+        payload = bytearray()
+        _encode_varint(indices[x.field], payload)
+        _encode_coefficients(x, payload)
+        records.append(_record(_ELEMENT_RECORD, payload))
+        yield b''.join(records)
+
+
+def dump(iterable, f):
+    """write the constructible numbers in iterable to the binary file f"""
+    for chunk in dump_iter(iterable):
+        f.write(chunk)
+
+
+def _check_header(data):
+    if bytes(data[:len(_MAGIC)]) != _MAGIC:
+        raise ValueError('not a file of constructible numbers')
+    version, pos = _decode_varint(data, len(_MAGIC))
+    if version != _FORMAT_VERSION:
+        raise ValueError('unsupported format version %d' % version)
+    return pos
+
+
+def _decode_record(tag, payload, fields):
+    """decode a record, return the element or None for a field definition"""
+    index, pos = _decode_varint(payload, 0)
+    if tag == _FIELD_RECORD:
+        base = fields[index]
+        r, _ = _decode_coefficients(base, payload, pos)
+        fields.append(Field(r, base))
+        return None
+    if tag == _ELEMENT_RECORD:
+        return _decode_coefficients(fields[index], payload, pos)[0]
+    raise ValueError('unknown record type %d' % tag)
+
+
+def load_iter(f):
+    """read constructible numbers from the binary file f, yielding them one by one"""
+    header = bytearray(f.read(len(_MAGIC)))
+    while True:
+        byte = f.read(1)
+        if not byte:
+            raise ValueError('truncated header')
+        header += byte
+        if header[-1] < 0x80:
+            break
+    _check_header(header)
+
+    fields = [_Q]
+    while True:
+        tag = f.read(1)
+        if not tag:
+            return
+        length = shift = 0
+        while True:
+            byte = bytearray(f.read(1))[0]
+            length |= (byte & 0x7f) << shift
+            shift += 7
+            if byte < 0x80:
+                break
+        payload = bytearray(f.read(length))
+        if len(payload) != length:
+            raise ValueError('truncated record')
+        x = _decode_record(bytearray(tag)[0], payload, fields)
+        if x is not None:
+            yield x
+
+
+def load(f):
+    """return the list of constructible numbers in the binary file f"""
+    return list(load_iter(f))
+
+
+class ConstructibleReader(object):
+    """Random access to the elements of a file written by dump or dump_iter.
+
+    The file is memory mapped. Opening it reads the field definitions and
+    the offsets of the element records, an element is only decoded when
+    it is accessed by its index.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data = self._data = memoryview(self._map)
+        if not isinstance(data[0], int):  # Python 2
+            data = self._data = bytearray(self._map)
+        pos = _check_header(data)
+        self._fields = [_Q]
+        self._offsets = []
+        while pos < len(data):
+            tag = data[pos]
+            length, start = _decode_varint(data, pos + 1)
+            pos = start + length
+            if tag == _ELEMENT_RECORD:
+                self._offsets.append((start, pos))
+            else:
+                _decode_record(tag, data[start:pos], self._fields)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, index):
+        start, end = self._offsets[index]
+        return _decode_record(_ELEMENT_RECORD, self._data[start:end], self._fields)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self):
+        """release the memory map"""
+        if isinstance(self._data, memoryview):
+            self._data.release()
+        self._data = None
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Instrumentation
+#
+# The instrumented functions are replaced by timing wrappers only while an
+# Instrumentation is active, so there is no overhead when it is disabled.
+
+try:
+    _clock = time.perf_counter
+except AttributeError:  # Python 2
+    _clock = time.time
+
+
+def _argument_bits(q):
+    """bit size of an integer or a fraction"""
+    q = Fraction(q)
+    return max(abs(q.numerator).bit_length(), q.denominator.bit_length())
+
+
+def _coefficient_bits(x):
+    """bit size of the largest integer in the flat representation of x"""
+    nums, den = x._integer_coefficients()  # pylint: disable=protected-access
+    return max(abs(n).bit_length() for n in nums + [den])
+
+
+def _method_sizes(args):
+    return args[0].field.depth, _coefficient_bits(args[0])
+
+
+def _join_sizes(args):
+    return max(Field.of(f).depth for f in args[:2]), None
+
+
+# (owner, attribute name, sizes): sizes maps the arguments to (depth, bits)
+_instrumented = (
+    ('module', 'isqrt', lambda args: (0, _argument_bits(args[0]))),
+    ('module', 'fsqrt', lambda args: (0, _argument_bits(args[0]))),
+    ('Constructible', 'join_fields', _join_sizes),
+    ('Constructible', '_try_sqrt', _method_sizes),
+    ('Constructible', '_sign', _method_sizes),
+    ('Constructible', 'inverse', _method_sizes),
+    ('Constructible', 'minpoly', _method_sizes),
+    ('Constructible', '_compute_minpoly', _method_sizes),
+)
+
+
+def _bucket(bits):
+    """the power of two at or above bits, used as histogram bucket"""
+    return 1 << max(bits - 1, 0).bit_length() if bits else 0
+
+
+class Instrumentation(object):
+    """Counts and times calls of the expensive internal operations.
+
+    Use it as a context manager:
+
+        with constructible.Instrumentation() as stats:
+            ...
+        print(stats.report())
+
+    Times are inclusive, recursive calls are counted and timed individually.
+    Besides the calls it collects histograms of the tower depth of the
+    arguments and of the bit size of their coefficients (rounded up to
+    powers of two).
+    """
+    def __init__(self):
+        self.calls = {}
+        self.seconds = {}
+        self.depths = {}
+        self.bits = {}
+        self._saved = None
+
+    def record(self, name, seconds, depth, bits):
+        """record one call of the operation name"""
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        depths = self.depths.setdefault(name, {})
+        depths[depth] = depths.get(depth, 0) + 1
+        if bits is not None:
+            bits = _bucket(bits)
+            histogram = self.bits.setdefault(name, {})
+            histogram[bits] = histogram.get(bits, 0) + 1
+
+    def _wrap(self, name, func, sizes):
+        def wrapper(*args, **kwargs):
+            start = _clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = _clock() - start
+                depth, bits = sizes(args)
+                self.record(name, elapsed, depth, bits)
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        return wrapper
+
+    def enable(self):
+        """start collecting by installing the wrappers"""
+        global _active_instrumentation  # pylint: disable=global-statement
+        if _active_instrumentation is not None:
+            raise RuntimeError('an Instrumentation is already active')
+        _active_instrumentation = self
+        module = globals()
+        self._saved = []
+        for owner, attr, sizes in _instrumented:
+            if owner == 'module':
+                original = module[attr]
+                module[attr] = self._wrap(attr, original, sizes)
+            else:
+                original = Constructible.__dict__[attr]
+                name = 'Constructible.' + attr
+                if isinstance(original, staticmethod):
+                    wrapped = staticmethod(self._wrap(name, original.__get__(None, Constructible), sizes))
+                else:
+                    wrapped = self._wrap(name, original, sizes)
+                setattr(Constructible, attr, wrapped)
+            self._saved.append((owner, attr, original))
+
+    def disable(self):
+        """stop collecting and restore the original functions"""
+        global _active_instrumentation  # pylint: disable=global-statement
+        if _active_instrumentation is not self:
+            return
+        module = globals()
+        for owner, attr, original in self._saved:
+            if owner == 'module':
+                module[attr] = original
+            else:
+                setattr(Constructible, attr, original)
+        self._saved = None
+        _active_instrumentation = None
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+    def as_dict(self):
+        """the collected data as a dict of plain python objects"""
+        return {
+            name: {
+                'calls': self.calls[name],
+                'seconds': self.seconds[name],
+                'depths': dict(self.depths.get(name, {})),
+                'bits': dict(self.bits.get(name, {})),
+            }
+            for name in self.calls
+        }
+
+    def report(self):
+        """a human readable summary of the collected data"""
+        lines = ['%-30s %10s %12s %12s' % ('operation', 'calls', 'total ms', 'mean us')]
+        for name in sorted(self.calls, key=lambda n: -self.seconds[n]):
+            calls, seconds = self.calls[name], self.seconds[name]
+            lines.append('%-30s %10d %12.3f %12.3f' % (name, calls, seconds * 1e3, seconds / calls * 1e6))
+
+        depths, bits = {}, {}
+        for histogram in self.depths.values():
+            for k, v in histogram.items():
+                depths[k] = depths.get(k, 0) + v
+        for histogram in self.bits.values():
+            for k, v in histogram.items():
+                bits[k] = bits.get(k, 0) + v
+        lines.append('')
+        lines.append('tower depth:    ' + ', '.join('%d: %d' % kv for kv in sorted(depths.items())))
+        lines.append('coefficient bits: ' + ', '.join('<=%d: %d' % kv for kv in sorted(bits.items())))
+        return '\n'.join(lines)
+
+_active_instrumentation = None
+
+
+def instrument():
+    """return a new Instrumentation, to be used as context manager"""
+    return Instrumentation()
@@ -54,6 +54,27 @@ class TestHelperFunctions(TestCase):
         self.assertEqual(isqrt(16), (4, 1))
         self.assertEqual(isqrt(3 ** 4 * 5 ** 6), (9 * 125, 1))
 
+    def test_isqrt_large_factors(self):
+        ''' test isqrt on numbers with large prime factors '''
+        from constructible import isqrt
+        p, q = 1000000007, 998244353
+        self.assertEqual(isqrt(p * q), (1, p * q))
+        self.assertEqual(isqrt(p * p * q), (p, q))
+        self.assertEqual(isqrt(p ** 3 * q ** 4 * 12), (2 * p * q * q, 3 * p))
+        self.assertEqual(isqrt((2 ** 61 - 1) ** 2), (2 ** 61 - 1, 1))
+        self.assertEqual(isqrt(7 ** 30 * 2), (7 ** 15, 2))
+
+    def test_sqrt_large_radicand(self):
+        ''' sqrt only needs to detect perfect squares, not to factor '''
+        from constructible import sqrt
+        from fractions import Fraction as F
+        p = 100000000000000000039
+        q = 10000000000000000000009
+        r = 1000000000000000003
+        s = sqrt(F(p * q, r))
+        self.assertEqual(s * s, F(p * q, r))
+        self.assertEqual(sqrt(F(p * p, r * r)), F(p, r))
+
     def test_fsqrt(self):
         ''' test the fsqrt function '''
         from constructible import fsqrt
@@ -146,6 +167,11 @@ class TestArithmeticOperators(TestCase):
                     self.assertFalse(result.b)
                     self.assertFalse(result.field)
 
+    def test_compact(self):
+        ''' instances do not carry a __dict__ '''
+        from constructible import sqrt
+        self.assertFalse(hasattr(sqrt(2) + sqrt(3), '__dict__'))
+
     def test_expressions_type(self):
         from constructible import sqrt, Constructible
         s = sqrt(2)
@@ -218,6 +244,83 @@ class TestComparison(TestCase):
                         self.assertIsInstance(result, bool)
 
 
+class TestInterval(TestCase):
+    def test_enclosure(self):
+        ''' the interval encloses the value '''
+        from constructible import sqrt
+        from fractions import Fraction as F
+        for x in [sqrt(2), -sqrt(3) / 7, sqrt(2) + sqrt(3) - F(22, 7),
+                  sqrt(2 + sqrt(3)) - sqrt(5)]:
+            with self.subTest(x=x):
+                for prec in (8, 64, 256):
+                    lo, hi = x._interval(prec)
+                    self.assertTrue(lo <= hi)
+                    self.assertTrue(lo <= x * 2 ** prec <= hi)
+
+    def test_close_values(self):
+        ''' comparisons beyond the precision of the intervals '''
+        from constructible import sqrt
+        from fractions import Fraction as F
+        x = sqrt(2) + sqrt(3)
+        y = sqrt(5 + 2 * sqrt(6))
+        eps = F(1, 2 ** 2000)
+        self.assertTrue(x == y)
+        self.assertTrue(x < y + eps)
+        self.assertTrue(x - eps < y)
+        self.assertFalse(x > y + eps)
+        self.assertEqual((x - y - eps)._sign(), -1)
+
+
+class TestField(TestCase):
+    def test_rational_field(self):
+        from constructible import Constructible, Field
+        self.assertIs(Constructible(2).field, Field())
+        self.assertFalse(Field())
+        self.assertEqual(Field(), ())
+
+    def test_interned(self):
+        from constructible import sqrt, Field
+        from fractions import Fraction as F
+        self.assertIs(sqrt(2).field, sqrt(F(2)).field)
+        self.assertIs((sqrt(2) + sqrt(3)).field, (sqrt(2) * sqrt(3)).field)
+        self.assertIs(Field.of(tuple(sqrt(5).field)), sqrt(5).field)
+
+    def test_repr_roundtrip(self):
+        from constructible import sqrt, Constructible
+        from fractions import Fraction
+        r = sqrt(2) + sqrt(3)
+        s = eval(repr(r), {'Constructible': Constructible, 'Fraction': Fraction})
+        self.assertIs(s.field, r.field)
+        self.assertEqual(s, r)
+
+
+class TestJoinCache(TestCase):
+    def test_lru_cache(self):
+        from constructible import LRUCache
+        cache = LRUCache(maxsize=2)
+        cache.put(1, 'a')
+        cache.put(2, 'b')
+        self.assertEqual(cache.get(1), 'a')
+        cache.put(3, 'c')
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(3), 'c')
+        self.assertEqual(cache.info(), (2, 1, 2, 2))
+        cache.resize(1)
+        self.assertEqual(len(cache), 1)
+        cache.clear()
+        self.assertEqual(cache.info(), (0, 0, 1, 0))
+
+    def test_join_cached(self):
+        from constructible import sqrt, Constructible, join_cache
+        a, b = sqrt(2), sqrt(3)
+        join_cache.clear()
+        field, f1, f2 = Constructible.join_fields(a.field, b.field)
+        hits = join_cache.info().hits
+        self.assertIs(Constructible.join_fields(a.field, b.field)[0], field)
+        self.assertEqual(join_cache.info().hits, hits + 1)
+        self.assertEqual(f1(a) + f2(b), a + b)
+
+
 class TestSqrt(TestCase):
     def test_sqrt_2(self):
         from constructible import sqrt
@@ -301,6 +404,38 @@ class TestHeptadekagon(TestCase):
         self.assertEqual(c_i, 1)
         
 
+class TestFractionFree(TestCase):
+    def compute(self):
+        from constructible import sqrt
+        from fractions import Fraction as F
+        x = sqrt(2) + sqrt(3) * F(2, 3) - sqrt(2 + sqrt(3))
+        y = 1 / (x + sqrt(5))
+        return [x * x, x * y, y * y - x, (x - y) / F(7, 5), x / (y + 2)]
+
+    def test_same_results(self):
+        ''' the fraction free arithmetic gives the same representation '''
+        import constructible
+        saved = constructible.fraction_free_depth
+        try:
+            constructible.fraction_free_depth = None
+            expected = [repr(x) for x in self.compute()]
+            for depth in (1, 2, 3):
+                constructible.fraction_free_depth = depth
+                with self.subTest(depth=depth):
+                    self.assertEqual([repr(x) for x in self.compute()], expected)
+        finally:
+            constructible.fraction_free_depth = saved
+
+    def test_lazy_parts(self):
+        ''' products only compute their parts a and b when needed '''
+        from constructible import sqrt
+        x = (sqrt(2) + sqrt(3)) * (sqrt(2) - sqrt(3))
+        self.assertIsNone(x._a)
+        self.assertEqual(x, -1)
+        self.assertEqual(x.a, -1)
+        self.assertTrue(x.b.is_zero)
+
+
 class TestHash(TestCase):
     '''
     Main requirement of the hash is that objects comparing equal 
@@ -336,6 +471,17 @@ class TestHash(TestCase):
                 self.assertEqual(hash(a), hash(b), '%s == %s, but hash is different' % (a,b))
 
 
+    def test_cached(self):
+        '''
+        the minimal polynomial is computed once per instance
+        '''
+        from constructible import sqrt
+        a = sqrt(2) + sqrt(3)
+        self.assertIs(a.minpoly(), a.minpoly())
+        self.assertEqual(hash(a), hash(a))
+        self.assertIn(sqrt(3) + sqrt(2), {a})
+
+
 class TestMinPoly(TestCase):
     def test_substitution(self):
         ''' test that `a` substituted to `a.minpoly()` gives 0 '''
@@ -356,6 +502,18 @@ class TestMinPoly(TestCase):
             with self.subTest(a=a):
                 self.assertEqual(eval(a.minpoly(), a), 0, '%s is not a root of its minpoly' % (a,))
 
+    def test_propagation(self):
+        ''' minpolys derived for negation and rational scaling are correct '''
+        from constructible import sqrt, Constructible
+        from fractions import Fraction as F
+
+        x = sqrt(2 + sqrt(3)) - sqrt(5)
+        x.minpoly()
+        for y in [-x, x * F(-3, 4), x / F(5, 2), 2 * x]:
+            with self.subTest(y=y):
+                fresh = Constructible(y.a, y.b, y.field)
+                self.assertEqual(y.minpoly(), fresh.minpoly())
+
     def test_degree(self):
         ''' test that `a.minpoly()` has a certain degree '''
         from constructible import sqrt, Constructible
@@ -379,6 +537,496 @@ class TestMinPoly(TestCase):
                 self.assertEqual(len(a.minpoly()) - 1, deg(a), 'minpoly of %s has the wrong degree' % (a,))
 
 
+class TestMultiQuadratic(TestCase):
+    def test_sqrt235(self):
+        from constructible import MultiQuadratic
+        r = MultiQuadratic.sqrt(2) + MultiQuadratic.sqrt(3) + MultiQuadratic.sqrt(5)
+        r2 = r*r
+        r4 = r2*r2
+        r6 = r2*r4
+        r8 = r2*r6
+        self.assertTrue(r > 0)
+        self.assertEqual(r8 - 40*r6 + 352*r4 - 960*r2 + 576, 0)
+
+    def test_inverse(self):
+        from constructible import MultiQuadratic
+        from fractions import Fraction as F
+        for x in [MultiQuadratic(F(3, 7)),
+                  MultiQuadratic.sqrt(2) - 1,
+                  MultiQuadratic.sqrt(2) + MultiQuadratic.sqrt(6) + MultiQuadratic.sqrt(15)]:
+            with self.subTest(x=x):
+                self.assertEqual(x * (1 / x), 1)
+        self.assertRaises(ZeroDivisionError, MultiQuadratic(0).inverse)
+
+    def test_interoperability(self):
+        from constructible import MultiQuadratic, Constructible, sqrt
+        s2, s3 = MultiQuadratic.sqrt(2), MultiQuadratic.sqrt(3)
+        self.assertEqual(s2 + s3, sqrt(2) + sqrt(3))
+        self.assertEqual(sqrt(3) * sqrt(2), s2 * s3)
+        self.assertEqual(hash(s2 + s3), hash(sqrt(3) + sqrt(2)))
+        self.assertEqual(MultiQuadratic(sqrt(2) * sqrt(3)).coefs, {6: 1})
+        self.assertTrue(sqrt(3) > s2)
+        x = s2 + sqrt(1 + sqrt(2))
+        self.assertIsInstance(x, Constructible)
+        self.assertEqual(x - sqrt(2), sqrt(1 + sqrt(2)))
+
+    def test_str(self):
+        from constructible import MultiQuadratic
+        from fractions import Fraction as F
+        s2, s3 = MultiQuadratic.sqrt(2), MultiQuadratic.sqrt(3)
+        self.assertEqual(str(s2), 'sqrt(2)')
+        self.assertEqual(str(F(1, 2) - s2 * s3 * 3), '(1/2 - 3 * sqrt(6))')
+        self.assertEqual(str(MultiQuadratic.sqrt(8)), '2 * sqrt(2)')
+
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, 'requires numpy')
+class TestConstructibleArray(TestCase):
+    def values(self):
+        from constructible import sqrt
+        from fractions import Fraction as F
+        xs = [sqrt(2) + 1, F(1, 3), sqrt(3) - sqrt(2), 2 * sqrt(2 + sqrt(3))]
+        ys = [sqrt(3), F(-5, 2), sqrt(5), 1 - sqrt(2)]
+        return xs, ys
+
+    def test_common_field(self):
+        from constructible import ConstructibleArray, sqrt
+        xs, _ = self.values()
+        a = ConstructibleArray(xs)
+        self.assertEqual(len(a), 4)
+        self.assertEqual(a.field.depth, 2)
+        self.assertEqual(a.tolist(), xs)
+        self.assertEqual(list(a[1:3]), xs[1:3])
+
+    def test_arithmetic(self):
+        from constructible import ConstructibleArray, sqrt
+        from operator import add, sub, mul, truediv
+        xs, ys = self.values()
+        a, b = ConstructibleArray(xs), ConstructibleArray(ys)
+        for op in (add, sub, mul, truediv):
+            with self.subTest(op=op):
+                self.assertEqual(list(op(a, b)), [op(x, y) for x, y in zip(xs, ys)])
+                self.assertEqual(list(op(a, sqrt(7))), [op(x, sqrt(7)) for x in xs])
+                self.assertEqual(list(op(3, b)), [op(3, y) for y in ys])
+
+    def test_comparison(self):
+        from constructible import ConstructibleArray
+        from operator import eq, ne, lt, gt, le, ge
+        xs, ys = self.values()
+        a, b = ConstructibleArray(xs), ConstructibleArray(ys)
+        for op in (eq, ne, lt, gt, le, ge):
+            with self.subTest(op=op):
+                self.assertEqual(list(op(a, b)), [op(x, y) for x, y in zip(xs, ys)])
+        self.assertTrue(all(a == a * 1))
+
+    def test_float(self):
+        from constructible import ConstructibleArray
+        xs, _ = self.values()
+        for f, x in zip(ConstructibleArray(xs).to_float(), xs):
+            self.assertAlmostEqual(f, float(x))
+
+    def test_zero_division(self):
+        from constructible import ConstructibleArray, sqrt
+        a = ConstructibleArray([sqrt(2), sqrt(2) - sqrt(2)])
+        with self.assertRaisesRegex(ZeroDivisionError, 'element 1 '):
+            a.inverse()
+
+
+class TestExpression(TestCase):
+    def test_common_subexpressions(self):
+        from constructible import sqrt, lazy
+        x, y = lazy(sqrt(2)), lazy(sqrt(3))
+        self.assertIs(x + y, y + x)
+        self.assertIs(lazy(sqrt(2)), x)
+        self.assertIs((x + y) * (x - y), (x + y) * (x - y))
+
+    def test_evaluate(self):
+        from fractions import Fraction
+        from constructible import sqrt, lazy, Constructible, Expression
+        x, y = lazy(sqrt(2)), lazy(sqrt(3))
+        e = (x + y) * (x - y) / 2 + 1
+        self.assertIsInstance(e, Expression)
+        self.assertIsInstance(e.evaluate(), Constructible)
+        self.assertEqual(e, Fraction(1, 2))
+        self.assertEqual(str(e), '1/2')
+        self.assertEqual(float(sqrt(x + 1) * sqrt(x + 1)), float(sqrt(2) + 1))
+        self.assertTrue(x < y)
+        self.assertEqual(hash(x * x), hash(2))
+
+    def test_deep_graph(self):
+        from constructible import sqrt, lazy
+        e = lazy(sqrt(2))
+        for _ in range(5000):
+            e = e + 1
+        self.assertEqual(e - sqrt(2), 5000)
+
+
+class TestPickle(TestCase):
+    def test_roundtrip(self):
+        import pickle
+        from constructible import sqrt, Constructible
+        x = (1 + sqrt(2)) * (3 - sqrt(5)) / 7
+        values = [x, x + 1, Constructible(3), -sqrt(sqrt(2) + 1)]
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            result = pickle.loads(pickle.dumps(values, protocol))
+            self.assertEqual(result, values)
+            self.assertIs(result[0].field, x.field)
+            self.assertIs(result[1].field, result[0].field)
+
+    def test_parallel_map(self):
+        from constructible import sqrt, parallel_map
+        values = [sqrt(2) + k for k in range(10)]
+        self.assertEqual(parallel_map(float, values, max_workers=2),
+                         [float(x) for x in values])
+        self.assertEqual(parallel_map(float, values, max_workers=1),
+                         [float(x) for x in values])
+
+
+class TestSerialization(TestCase):
+    values = None
+
+    def setUp(self):
+        from constructible import sqrt, Constructible
+        x = (1 + sqrt(2)) * (3 - sqrt(5)) / 7
+        self.values = [x, x + 1, Constructible(-3), 0, -sqrt(sqrt(2) + 1), x * 10 ** 30]
+
+    def test_roundtrip(self):
+        import io
+        from constructible import dump, load
+        f = io.BytesIO()
+        dump(self.values, f)
+        f.seek(0)
+        result = load(f)
+        self.assertEqual(result, self.values)
+        self.assertIs(result[1].field, self.values[1].field)
+
+    def test_fields_written_once(self):
+        from constructible import dump_iter, sqrt
+        x = sqrt(2) + sqrt(3)
+        chunks = list(dump_iter([x, x + 1]))
+        self.assertEqual(len(chunks), 3)
+        self.assertGreater(len(chunks[1]), len(chunks[2]))
+
+    def test_errors(self):
+        import io
+        from constructible import load
+        self.assertRaises(ValueError, load, io.BytesIO(b'nothing here'))
+        self.assertRaises(ValueError, load, io.BytesIO(b'CNST\x63'))
+
+    def test_reader(self):
+        import os
+        import tempfile
+        from constructible import dump, ConstructibleReader
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                dump(self.values, f)
+            with ConstructibleReader(path) as reader:
+                self.assertEqual(len(reader), len(self.values))
+                self.assertEqual(reader[4], self.values[4])
+                self.assertEqual(reader[-1], self.values[-1])
+                self.assertEqual(list(reader), self.values)
+        finally:
+            os.remove(path)
+
+
+class TestPolynomials(TestCase):
+    @staticmethod
+    def schoolbook(p, q):
+        result = [0] * (len(p) + len(q) - 1)
+        for i, a in enumerate(p):
+            for j, b in enumerate(q):
+                result[i + j] += a * b
+        return result
+
+    def test_poly_mul(self):
+        import random
+        from constructible import _poly_mul, _int_poly_mul
+        rnd = random.Random(1)
+        for n, m in [(1, 1), (3, 40), (17, 16), (33, 64), (100, 9)]:
+            p = [rnd.randint(-10 ** 20, 10 ** 20) for _ in range(n)]
+            q = [rnd.randint(-10, 10) for _ in range(m)]
+            with self.subTest(n=n, m=m):
+                self.assertEqual(_poly_mul(p, q, 0), self.schoolbook(p, q))
+                self.assertEqual(_int_poly_mul(p, q), self.schoolbook(p, q))
+                self.assertEqual(_int_poly_mul(q, q), self.schoolbook(q, q))
+
+    def test_deep_minpoly(self):
+        from constructible import sqrt
+        x = 0
+        for p in (2, 3, 5, 7, 11, 13):
+            x += sqrt(p) / 3
+        poly = x.minpoly()
+        self.assertEqual(len(poly), 65)
+        self.assertEqual(poly[-1], 1)
+        # -x is a conjugate of x, so the polynomial is even
+        self.assertTrue(all(c == 0 for c in poly[1::2]))
+        self.assertEqual((x * x - 1).minpoly()[-1], 1)
+
+
+class TestBatch(TestCase):
+    def test_batch_inverse(self):
+        from constructible import sqrt, batch_inverse
+        values = [2, sqrt(2) + 1, sqrt(3) - sqrt(2)]
+        result = batch_inverse(values)
+        self.assertEqual([x * y for x, y in zip(values, result)], [1, 1, 1])
+        self.assertEqual(len(set(x.field for x in result)), 1)
+        self.assertEqual(batch_inverse([]), [])
+
+    def test_batch_divide(self):
+        from fractions import Fraction
+        from constructible import sqrt, batch_divide
+        self.assertEqual(batch_divide([1, sqrt(6), 3], [sqrt(2), sqrt(3), 2]),
+                         [sqrt(2) / 2, sqrt(2), Fraction(3, 2)])
+        self.assertRaises(ValueError, batch_divide, [1, 2], [1])
+
+    def test_zero(self):
+        from constructible import sqrt, batch_inverse, batch_divide
+        with self.assertRaisesRegex(ZeroDivisionError, 'element 1 '):
+            batch_inverse([sqrt(2), sqrt(2) - sqrt(2), 0])
+        with self.assertRaisesRegex(ZeroDivisionError, 'element 0 '):
+            batch_divide([1, 2], [0, 1])
+
+
+class TestMatrix(TestCase):
+    @staticmethod
+    def leibniz(rows):
+        from itertools import permutations
+        n = len(rows)
+        result = 0
+        for perm in permutations(range(n)):
+            inversions = sum(perm[i] > perm[j] for i in range(n) for j in range(i + 1, n))
+            term = (-1) ** inversions
+            for i in range(n):
+                term = rows[i][perm[i]] * term
+            result = term + result
+        return result
+
+    def matrix(self):
+        from constructible import sqrt
+        return [[sqrt(2), 1, 0, 3],
+                [1 + sqrt(3), 0, 2, sqrt(6)],
+                [0, 0, sqrt(3), 1],
+                [5, sqrt(2) - 1, 0, 7]]
+
+    def test_determinant(self):
+        from constructible import Matrix
+        rows = self.matrix()
+        self.assertEqual(Matrix(rows).determinant(), self.leibniz(rows))
+        self.assertEqual(Matrix([[1, 2], [2, 4]]).determinant(), 0)
+        self.assertEqual(Matrix([[0, 1], [1, 0]]).determinant(), -1)
+        self.assertRaises(ValueError, Matrix([[1, 2]]).determinant)
+
+    def test_rank_and_pivots(self):
+        from constructible import Matrix, sqrt
+        m = Matrix([[0, 2, 4], [0, 1, 2], [0, sqrt(2), 1]])
+        self.assertEqual(m.rank(), 2)
+        echelon, pivots = m.echelon_form()
+        self.assertEqual(pivots, [(0, 1), (1, 2)])
+        self.assertEqual(echelon[0, 1], 1)
+        self.assertEqual(Matrix(self.matrix()).rank(), 4)
+
+    def test_solve_and_inverse(self):
+        from constructible import Matrix, sqrt
+        m = Matrix(self.matrix())
+        b = [1, sqrt(2), 0, 3]
+        x = m.solve(b)
+        self.assertEqual(m * Matrix([[v] for v in x]), Matrix([[v] for v in b]))
+        self.assertEqual(m * m.inverse(), Matrix.identity(4))
+        self.assertRaises(ZeroDivisionError, Matrix([[1, 2], [2, 4]]).inverse)
+
+
+class TestSorting(TestCase):
+    def values(self):
+        from fractions import Fraction
+        from constructible import sqrt
+        return [sqrt(2), 1, sqrt(3) - sqrt(2), Fraction(7, 5), sqrt(2) * sqrt(3) / sqrt(3),
+                -sqrt(5), 0, sqrt(2) + Fraction(1, 10 ** 30), Fraction(3, 2)]
+
+    def test_sorted_exact(self):
+        from constructible import sorted_exact
+        values = self.values()
+        self.assertEqual(sorted_exact(values), sorted(values))
+        self.assertEqual(sorted_exact(values, reverse=True), sorted(values, reverse=True))
+        self.assertEqual(sorted_exact(values, key=lambda x: -x), sorted(values, key=lambda x: -x))
+        self.assertEqual(sorted_exact([]), [])
+
+    def test_stable(self):
+        from constructible import sorted_exact, sqrt
+        # equal numbers represented in different fields
+        x, y = sqrt(2), sqrt(2) * sqrt(3) / sqrt(3)
+        self.assertIsNot(x.field, y.field)
+        self.assertIs(sorted_exact([y, 2, x])[0], y)
+        self.assertIs(sorted_exact([x, 2, y])[0], x)
+        self.assertIs(sorted_exact([x, 0, y], reverse=True)[0], x)
+
+    def test_sort_key(self):
+        from constructible import sort_key
+        values = self.values()
+        self.assertEqual(sorted(values, key=sort_key), sorted(values))
+
+
+class TestSimplify(TestCase):
+    def test_rational(self):
+        from constructible import sqrt
+        x = (sqrt(2) + sqrt(3)) * (sqrt(2) + sqrt(3)) - 2 * sqrt(6)
+        self.assertEqual(x.field.depth, 2)
+        y = x.simplify()
+        self.assertFalse(y.field)
+        self.assertEqual(y, 5)
+
+    def test_subtower(self):
+        from constructible import sqrt
+        x = (sqrt(2) + sqrt(3) + sqrt(5)) * sqrt(5) - 5 - sqrt(15)
+        y = x.simplify()
+        self.assertEqual(x.field.depth, 3)
+        self.assertEqual(y.field.depth, 2)
+        self.assertEqual(y, sqrt(2) * sqrt(5))
+        self.assertIs(y.simplify(), y)
+
+    def test_radicand_dependency(self):
+        from constructible import sqrt
+        u = sqrt(1 + sqrt(2))
+        x = u + sqrt(3) - sqrt(3)
+        y = x.simplify()
+        # the level of sqrt(2) is kept, the radicand of u needs it
+        self.assertIs(y.field, u.field)
+        self.assertEqual(y, u)
+
+    def test_auto_simplify(self):
+        import constructible
+        from constructible import sqrt
+        constructible.auto_simplify = True
+        try:
+            x = sqrt(2) * sqrt(2)
+            self.assertFalse(x.field)
+            self.assertEqual((sqrt(2) * sqrt(3) * sqrt(3)).inverse().field.depth, 1)
+            self.assertEqual(hash(x), hash(2))
+            self.assertEqual(sqrt(x * 8), 4)
+            self.assertEqual((sqrt(2) + sqrt(3)) * (sqrt(2) - sqrt(3)), -1)
+        finally:
+            constructible.auto_simplify = False
+
+
+class TestModularZeroTest(TestCase):
+    def test_sqrt_mod(self):
+        from constructible import _sqrt_mod
+        p = 1000003
+        for a in (2, 3, 5, 7, 11):
+            with self.subTest(a=a):
+                r = _sqrt_mod(a, p)
+                if r is not None:
+                    self.assertEqual(r * r % p, a)
+                else:
+                    self.assertEqual(pow(a, (p - 1) // 2, p), p - 1)
+
+    def test_differ(self):
+        from constructible import sqrt, _modular_differ
+        self.assertTrue(_modular_differ(sqrt(2) + sqrt(3), sqrt(5) + sqrt(7)))
+        self.assertFalse(_modular_differ(sqrt(6), sqrt(2) * sqrt(3)))
+        self.assertFalse(_modular_differ(sqrt(6) + 1, sqrt(2) * sqrt(3) + 1))
+        # nested radicands are not handled
+        self.assertIsNone(_modular_differ(sqrt(2 + sqrt(2)), sqrt(2)))
+
+    def test_equality(self):
+        import constructible
+        from constructible import sqrt
+        x = sqrt(2) * sqrt(3) * sqrt(5)
+        for enabled in (True, False):
+            constructible.modular_zero_test = enabled
+            try:
+                with self.subTest(enabled=enabled):
+                    self.assertEqual(x, sqrt(30))
+                    self.assertNotEqual(x, sqrt(30) + sqrt(7) - sqrt(7) + 1)
+                    self.assertNotEqual(sqrt(2) + sqrt(3), sqrt(5) + sqrt(7))
+            finally:
+                constructible.modular_zero_test = True
+
+
+class TestPrimitiveField(TestCase):
+    def test_modulus(self):
+        from constructible import PrimitiveField, sqrt
+        field = PrimitiveField((sqrt(2) + sqrt(3)).field)
+        self.assertEqual(field.degree, 4)
+        self.assertEqual(field.modulus[-1], 1)
+        poly = field.theta.minpoly()
+        self.assertEqual(list(poly), field.modulus)
+
+    def test_roundtrip(self):
+        from constructible import PrimitiveField, sqrt
+        x = (1 + sqrt(2)) * (sqrt(3) - sqrt(5)) / 7
+        field = PrimitiveField(x.field)
+        self.assertEqual(field.element(x).to_constructible(), x)
+        self.assertEqual(field.element(sqrt(2)).to_constructible(), sqrt(2))
+        self.assertEqual(field.element(3).to_constructible(), 3)
+        self.assertRaises(ValueError, field.element, sqrt(7))
+
+    def test_arithmetic(self):
+        from fractions import Fraction
+        from constructible import PrimitiveField, sqrt
+        r = sqrt(1 + sqrt(2))
+        x, y = r + sqrt(3), r * sqrt(3) - 2
+        x, y = x.join(y)
+        field = PrimitiveField(x.field)
+        px, py = field.element(x), field.element(y)
+        self.assertEqual((px * py).to_constructible(), x * y)
+        self.assertEqual((px + py).to_constructible(), x + y)
+        self.assertEqual((px - py).to_constructible(), x - y)
+        self.assertEqual((px / py).to_constructible(), x / y)
+        self.assertEqual((px * Fraction(2, 3)).to_constructible(), x * Fraction(2, 3))
+        self.assertEqual(px * px.inverse(), 1)
+        self.assertEqual(hash(px * 0 + 2), hash(2))
+        self.assertEqual(px, x)
+        self.assertAlmostEqual(float(px), float(x))
+
+
+class TestInstrumentation(TestCase):
+    def test_collect(self):
+        import constructible
+        from constructible import sqrt, Constructible
+        sign = Constructible._sign
+        with constructible.instrument() as stats:
+            x = sqrt(2) + sqrt(3)
+            self.assertTrue(x > sqrt(5))
+            hash(x - 1)
+            constructible.fsqrt(12)
+        data = stats.as_dict()
+        self.assertEqual(data['fsqrt']['calls'], 1)
+        self.assertEqual(data['isqrt']['calls'], 2)
+        self.assertIn('Constructible.join_fields', data)
+        self.assertIn(2, data['Constructible.minpoly']['depths'])
+        self.assertIn('Constructible.minpoly', stats.report())
+        # disabled again
+        self.assertIs(Constructible._sign, sign)
+        self.assertIs(constructible.Instrumentation, type(stats))
+
+    def test_single_active(self):
+        import constructible
+        with constructible.instrument():
+            self.assertRaises(RuntimeError, constructible.instrument().enable)
+
+
+class TestBenchmarks(TestCase):
+    def test_compare(self):
+        from bench_constructible import compare
+        before = {'results': {'a': {'seconds': 1.0}, 'b': {'seconds': 1.0}, 'c': {'seconds': 1.0}}}
+        after = {'results': {'a': {'seconds': 0.5}, 'b': {'seconds': 2.0}}}
+        rows, slower = compare(before, after, threshold=1.25)
+        self.assertEqual([row[0] for row in rows], ['a', 'b'])
+        self.assertEqual(slower, ['b'])
+
+    def test_benchmarks_run(self):
+        from bench_constructible import BENCHMARKS
+        for bench, params in BENCHMARKS:
+            with self.subTest(bench=bench.__name__):
+                bench(params[0])()
+
+
 if __name__ == "__main__":
     # import sys;sys.argv = ['', 'Test.testName']
     unittest.main()